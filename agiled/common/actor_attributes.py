@@ -145,3 +145,12 @@ class ActorAttributes:
     current_hitpoints = property(get_current_hitpoints, set_current_hitpoints)
     base_speed = property(get_base_speed, set_base_speed)
     current_speed = property(get_current_speed, set_current_speed)
+
+    # Methods
+    # ----------------------------------------------------------------------
+    def reset(self) -> None:
+        """Restore every current attribute to its base value"""
+        self._current_defense = self._base_defense
+        self._current_hitpoints = self._base_hitpoints
+        self._current_strength = self._base_strength
+        self._current_speed = self._base_speed
@@ -0,0 +1,77 @@
+"""Process-wide cache of image assets and their transformed variants"""
+from typing import Optional
+
+import pygame
+
+# Loaded surfaces keyed on (path, scale, flip, tint)
+_images = {}
+
+
+def load_image(img_path: str, scale: Optional[tuple] = None, flip: Optional[tuple] = None,
+               tint: Optional[tuple] = None) -> pygame.Surface:
+    """Return an image, loading it from disk only the first time it is asked for
+
+    Surfaces are converted to the display's pixel format when a display
+    exists, which makes blitting them much cheaper. Only images with
+    transparent pixels keep an alpha channel, so opaque ones get the faster
+    plain blit. The returned Surface is shared with every other caller, so
+    it must not be drawn on.
+
+    Args:
+        img_path (str): Absolute path of the image, from util.get_absolute_path_of_asset
+        scale (tuple, optional): Width/height to scale the image to
+        flip (tuple, optional): Whether to flip the image on the x/y axes
+        tint (tuple, optional): RGB(A) color multiplied into the image
+
+    Returns:
+        pygame.Surface: The shared image
+    """
+    key = (img_path, scale, flip, tint)
+
+    image = _images.get(key)
+    if image is not None:
+        return image
+
+    if scale is None and flip is None and tint is None:
+        image = _convert(pygame.image.load(img_path))
+    else:
+        # Derived variants are built from the cached original
+        image = load_image(img_path)
+
+        if scale is not None:
+            image = pygame.transform.scale(image, scale)
+        if flip is not None:
+            image = pygame.transform.flip(image, flip[0], flip[1])
+        if tint is not None:
+            image = image.copy()
+            image.fill(tint, special_flags=pygame.BLEND_RGBA_MULT)
+
+    _images[key] = image
+    return image
+
+
+def _convert(image: pygame.Surface) -> pygame.Surface:
+    """Convert an image to the display's pixel format, if there is a display"""
+    if pygame.display.get_surface() is None:
+        return image
+
+    if has_transparency(image):
+        return image.convert_alpha()
+    return image.convert()
+
+
+def has_transparency(image: pygame.Surface) -> bool:
+    """Return whether any pixel of an image is not fully opaque
+
+    Args:
+        image (pygame.Surface): The image to check
+
+    Returns:
+        bool: True if the image needs its alpha channel to draw correctly
+    """
+    if image.get_colorkey() is not None:
+        return True
+    if not image.get_flags() & pygame.SRCALPHA:
+        return False
+
+    return int(pygame.surfarray.array_alpha(image).min()) < 255
@@ -30,7 +30,10 @@ class Music():
         self._current_song_path = util.get_absolute_path_of_asset("audio", "music", song.value)
 
     def play(self) -> None:
-        """Play the object's music"""
+        """Play the object's music, unless audio is off"""
+        if SOUND_BANK.is_null or not pygame.mixer.get_init():
+            return
+
         pygame.mixer.music.load(self._current_song_path)
         pygame.mixer.music.play(self._loops)
 
@@ -82,8 +85,81 @@ class SoundEffect():
     def __init__(self, sound_effect: Effect):
         self._sound_effect = sound_effect
         self._full_path = util.get_absolute_path_of_asset("audio", "effects", sound_effect.value)
-        self._sound_object = pygame.mixer.Sound(self._full_path)
+        self._sound_object = SOUND_BANK.load(sound_effect)
 
     def play(self) -> None:
         """Play the current sound effect"""
-        self._sound_object.play()
+        if self._sound_object is not None:
+            self._sound_object.play()
+
+
+class SoundBank():
+    """Decoded sound effects, shared by everything that plays them
+
+    Each effect is decoded from disk once, either up front with preload()
+    or on first use, so playing a sound never touches the filesystem.
+
+    Attributes:
+        _sounds: Dictionary mapping SoundEffect.Effect to pygame.mixer.Sound objects
+    """
+    # Whether this bank never makes a sound
+    is_null = False
+
+    def __init__(self) -> None:
+        self._sounds = {}
+
+    def load(self, effect: SoundEffect.Effect) -> pygame.mixer.Sound:
+        """Get the decoded sound for an effect, decoding it if needed
+
+        Args:
+            effect (SoundEffect.Effect): The effect to load
+
+        Returns:
+            pygame.mixer.Sound: The decoded sound, or None if the mixer
+                                is not initialized
+        """
+        sound = self._sounds.get(effect)
+
+        if sound is None and pygame.mixer.get_init():
+            full_path = util.get_absolute_path_of_asset("audio", "effects", effect.value)
+            sound = pygame.mixer.Sound(full_path)
+            self._sounds[effect] = sound
+
+        return sound
+
+    def preload(self) -> None:
+        """Decode every sound effect ahead of time"""
+        for effect in SoundEffect.Effect:
+            self.load(effect)
+
+    def play(self, effect: SoundEffect.Effect) -> None:
+        """Play a sound effect and return immediately
+
+        Args:
+            effect (SoundEffect.Effect): The effect to play
+        """
+        sound = self.load(effect)
+
+        if sound is not None:
+            sound.play()
+
+
+class NullSoundBank(SoundBank):
+    """Sound bank that never decodes or plays anything, for headless runs"""
+    is_null = True
+
+    def load(self, effect: SoundEffect.Effect) -> pygame.mixer.Sound:
+        return None
+
+    def play(self, effect: SoundEffect.Effect) -> None:
+        pass
+
+
+# The sound bank shared by the whole game
+SOUND_BANK = SoundBank()
+
+
+def use_null_backend() -> None:
+    """Silence all audio, so nothing touches the mixer or decodes sounds"""
+    global SOUND_BANK
+    SOUND_BANK = NullSoundBank()
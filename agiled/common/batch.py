@@ -0,0 +1,205 @@
+"""Seeded batch runs of bot players across every core, for balancing
+
+Each run plays one life of the game from a seed with a BotInputProvider
+and reports how it went. Runs are independent, so they are spread over a
+process pool, and each worker loads the assets and map templates once.
+
+Usage, from the agiled directory:
+    python -m common.batch --runs 1000 --max-ticks 36000
+"""
+import argparse
+import multiprocessing
+import statistics
+import time
+from typing import Iterable, List, NamedTuple, Optional
+
+from common import audio
+from common.entity import Boss, Player
+from common.headless import HeadlessRunner
+from common.input import BotInputProvider
+from common.map_generator import DungeonGenerator
+from common.rotation_cache import get_rotation_cache
+from common.tileset import get_shared_tile_set
+from common.weapon import ARROW_IMAGE_PATH
+
+
+class RunStats(NamedTuple):
+    """How one seeded run went
+
+    Attributes:
+        seed (int): The run's seed
+        ticks (int): Ticks simulated
+        died (bool): Whether the run ended in death rather than the tick limit
+        floors_cleared (int): Dungeons finished before the run ended
+        kills (int): Enemies killed
+        score (int): Final score
+        damage_taken (int): Hitpoints the player lost, not counting healing
+        time_to_kill (float): Mean ticks from an enemy appearing to its death,
+                              None if nothing was killed
+    """
+    seed: int
+    ticks: int
+    died: bool
+    floors_cleared: int
+    kills: int
+    score: int
+    damage_taken: int
+    time_to_kill: Optional[float]
+
+
+# Stats summarized in the aggregate table
+SUMMARY_FIELDS = ("ticks", "floors_cleared", "kills", "score", "damage_taken", "time_to_kill")
+
+
+def init_worker() -> None:
+    """Load everything a run needs once, when a worker process starts"""
+    audio.use_null_backend()
+
+    # Tile images, map templates and sprite images are cached per process
+    get_shared_tile_set()
+    DungeonGenerator()
+    Player()
+    Boss()
+    get_rotation_cache(ARROW_IMAGE_PATH)
+
+
+def simulate_run(seed: int, max_ticks: int = 36000) -> RunStats:
+    """Play one life from a seed with a bot and measure it
+
+    Args:
+        seed (int): Seeds both the dungeon and the bot
+        max_ticks (int): Ticks after which a run still alive is stopped
+
+    Returns:
+        RunStats: The run's stats
+    """
+    runner = HeadlessRunner(BotInputProvider(seed), seed=seed, respawn=False)
+    state = runner.state
+
+    player = state.player
+    hitpoints = player.attributes.current_hitpoints
+    damage_taken = 0
+
+    # When each live enemy was first seen, and how long each dead one lived
+    first_seen = {}
+    lifetimes = []
+
+    for tick in range(max_ticks):
+        runner.step()
+
+        current = player.attributes.current_hitpoints
+        if current < hitpoints:
+            damage_taken += hitpoints - current
+        hitpoints = current
+
+        alive = {}
+        for enemy in state.actors:
+            alive[enemy] = first_seen.get(enemy, tick)
+
+        for enemy, seen in first_seen.items():
+            if enemy not in alive and enemy.is_dead():
+                lifetimes.append(tick - seen)
+        first_seen = alive
+
+        if state.game_is_over():
+            break
+
+    return RunStats(
+        seed=seed,
+        ticks=runner.ticks,
+        died=state.game_is_over(),
+        floors_cleared=state.get_room_count() - 1,
+        kills=state.get_kills(),
+        score=state.get_score(),
+        damage_taken=damage_taken,
+        time_to_kill=statistics.mean(lifetimes) if lifetimes else None
+    )
+
+
+def _simulate_run(args: tuple) -> RunStats:
+    """simulate_run() taking one tuple, for Pool.imap_unordered"""
+    return simulate_run(*args)
+
+
+def run_batch(seeds: Iterable[int], max_ticks: int = 36000, workers: int = None) -> List[RunStats]:
+    """Simulate many seeded runs in parallel
+
+    Args:
+        seeds (Iterable[int]): One run is played per seed
+        max_ticks (int): Ticks after which a run still alive is stopped
+        workers (int): Worker processes, one per core if None
+
+    Returns:
+        List[RunStats]: Each run's stats, in seed order
+    """
+    jobs = [(seed, max_ticks) for seed in seeds]
+
+    with multiprocessing.Pool(workers, initializer=init_worker) as pool:
+        results = list(pool.imap_unordered(_simulate_run, jobs, chunksize=4))
+
+    return sorted(results, key=lambda stats: stats.seed)
+
+
+def format_summary(results: List[RunStats]) -> str:
+    """Return a table of the mean, spread and range of each stat
+
+    Runs where a stat has no value, like time_to_kill for runs without a
+    kill, are left out of that stat's row, and the runs column says how
+    many it covers.
+
+    Args:
+        results (List[RunStats]): The runs to summarize
+
+    Returns:
+        str: The table, one stat per row
+    """
+    lines = [
+        "{} runs, {} died".format(len(results), sum(stats.died for stats in results)),
+        "{:<16}{:>6}{:>10}{:>10}{:>10}{:>10}{:>10}".format("stat", "runs", "mean", "median", "stdev", "min", "max")
+    ]
+
+    for field in SUMMARY_FIELDS:
+        values = [getattr(stats, field) for stats in results if getattr(stats, field) is not None]
+        if not values:
+            lines.append("{:<16}{:>6}{:>10}".format(field, 0, "no data"))
+            continue
+
+        lines.append("{:<16}{:>6}{:>10.1f}{:>10.1f}{:>10.1f}{:>10.1f}{:>10.1f}".format(
+            field,
+            len(values),
+            statistics.mean(values),
+            statistics.median(values),
+            statistics.stdev(values) if len(values) > 1 else 0.0,
+            min(values),
+            max(values)
+        ))
+
+    return "\n".join(lines)
+
+
+def main() -> None:
+    """Run a batch from the command line and print the aggregate table"""
+    parser = argparse.ArgumentParser(description="Simulate seeded Agile Dungeon runs with a bot")
+    parser.add_argument("--runs", type=int, default=100, help="Number of runs")
+    parser.add_argument("--first-seed", type=int, default=1, help="Seed of the first run; the rest follow on")
+    parser.add_argument("--max-ticks", type=int, default=36000, help="Ticks before a surviving run is stopped")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes, one per core by default")
+    parser.add_argument("--csv", default=None, help="Also write every run's stats to this file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = run_batch(range(args.first_seed, args.first_seed + args.runs), args.max_ticks, args.workers)
+    elapsed = time.perf_counter() - start
+
+    print(format_summary(results))
+    print("{} ticks in {:.1f}s".format(sum(stats.ticks for stats in results), elapsed))
+
+    if args.csv:
+        with open(args.csv, "w") as csv_file:
+            csv_file.write(",".join(RunStats._fields) + "\n")
+            for stats in results:
+                csv_file.write(",".join("" if value is None else str(value) for value in stats) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""Grid-indexed collision lookups for the tiles of a room"""
+from typing import List, Optional
+
+import numpy as np
+import pygame
+
+TILE_SIZE = 32
+
+
+class TileCollisionMap:
+    """Lookup table mapping the cells of a room's grid to their tiles.
+
+    An entity's rect maps directly to the handful of cells it overlaps, so
+    tile collision checks cost the same no matter how large the room is.
+
+    Args:
+        grid (ndarray): The room's grid of tile ids. It is shared, not
+                        copied, so edits to the room are seen right away.
+        tiles (List[Tile]): The shared Tile for each tile id
+        tile_size (int): Size of a tile, in pixels
+
+    Attributes:
+        _grid (ndarray): The room's grid of tile ids
+        _tiles (List[Tile]): The shared Tile for each tile id
+        _passable (List[bool]): Whether each tile id is passable
+        _rows (int): Number of rows in the grid
+        _columns (int): Number of columns in the grid
+    """
+    def __init__(self, grid: np.ndarray, tiles: list, tile_size: int = TILE_SIZE) -> None:
+        self._grid = grid
+        self._tiles = tiles
+        self._passable = [tile.is_passable for tile in tiles]
+        self._tile_size = tile_size
+        self._rows, self._columns = grid.shape
+
+    # Getters
+    # ----------------------------------------------------------------------
+    def get_tile(self, row: int, column: int):
+        """Returns the tile at a grid cell
+
+        Args:
+            row (int): The row of the cell
+            column (int): The column of the cell
+
+        Returns:
+            Tile: The tile at that cell
+        """
+        return self._tiles[self._grid.item(row, column)]
+
+    def get_size(self) -> tuple:
+        """Returns the size of the grid
+
+        Returns:
+            tuple: (rows, columns) of the grid
+        """
+        return (self._rows, self._columns)
+
+    # Methods
+    # ----------------------------------------------------------------------
+    def get_cell_span(self, rect: pygame.Rect) -> tuple:
+        """Returns the range of cells a rect overlaps, clipped to the grid
+
+        Args:
+            rect (pygame.Rect): The rect to look up
+
+        Returns:
+            tuple: (first_row, last_row, first_column, last_column), inclusive.
+                   The span is empty when the first index exceeds the last.
+        """
+        size = self._tile_size
+
+        first_column = max(rect.left // size, 0)
+        last_column = min((rect.right - 1) // size, self._columns - 1)
+        first_row = max(rect.top // size, 0)
+        last_row = min((rect.bottom - 1) // size, self._rows - 1)
+
+        return (first_row, last_row, first_column, last_column)
+
+    def get_tiles_colliding_with(self, rect: pygame.Rect) -> List:
+        """Returns the tiles overlapped by a rect, in row-major order
+
+        Args:
+            rect (pygame.Rect): The rect to check
+
+        Returns:
+            List[Tile]: The tiles the rect overlaps
+        """
+        tiles = self._tiles
+        return [tiles[tile_id] for tile_id in self.get_tile_ids_colliding_with(rect)]
+
+    def get_tile_ids_colliding_with(self, rect: pygame.Rect) -> List[int]:
+        """Returns the ids of the tiles overlapped by a rect, in row-major order
+
+        Args:
+            rect (pygame.Rect): The rect to check
+
+        Returns:
+            List[int]: The tile ids the rect overlaps
+        """
+        if rect.width <= 0 or rect.height <= 0:
+            return []
+
+        first_row, last_row, first_column, last_column = self.get_cell_span(rect)
+
+        return self._grid[first_row:last_row + 1, first_column:last_column + 1].ravel().tolist()
+
+    def is_rect_passable(self, rect: pygame.Rect) -> bool:
+        """Returns whether every tile a rect overlaps is passable
+
+        Args:
+            rect (pygame.Rect): The rect to check
+
+        Returns:
+            bool: Whether the rect only overlaps passable tiles
+        """
+        passable = self._passable
+        return all(passable[tile_id] for tile_id in self.get_tile_ids_colliding_with(rect))
+
+    def get_sweeps_near_walls(self, start_x: np.ndarray, start_y: np.ndarray, end_x: np.ndarray,
+                              end_y: np.ndarray, width: np.ndarray, height: np.ndarray) -> np.ndarray:
+        """Returns, for many boxes moving at once, whether the area each one
+        sweeps holds an impassable cell. Only those need sweep_box()
+
+        Impassable cells are counted with a summed-area table, so each box
+        costs four lookups however far it moves.
+
+        Args:
+            start_x, start_y (ndarray): Centre of each box before moving, in pixels
+            end_x, end_y (ndarray): Centre of each box after moving, in pixels
+            width, height (ndarray): Size of each box
+
+        Returns:
+            ndarray: A boolean per box
+        """
+        size = self._tile_size
+        rows, columns = self._rows, self._columns
+
+        blocked = ~np.array(self._passable)[self._grid]
+        table = np.zeros((rows + 1, columns + 1), dtype=np.int32)
+        np.cumsum(np.cumsum(blocked, axis=0), axis=1, out=table[1:, 1:])
+
+        first_column = np.maximum((np.minimum(start_x, end_x) - width / 2) // size, 0).astype(np.int64)
+        last_column = np.minimum((np.maximum(start_x, end_x) + width / 2) // size, columns - 1).astype(np.int64)
+        first_row = np.maximum((np.minimum(start_y, end_y) - height / 2) // size, 0).astype(np.int64)
+        last_row = np.minimum((np.maximum(start_y, end_y) + height / 2) // size, rows - 1).astype(np.int64)
+
+        # Boxes entirely off the grid overlap no cells; point them at a real
+        # cell so the lookups below stay in range, and drop them at the end
+        on_grid = (first_column <= last_column) & (first_row <= last_row)
+        first_column = np.minimum(first_column, columns - 1)
+        first_row = np.minimum(first_row, rows - 1)
+        last_column = np.maximum(last_column, first_column)
+        last_row = np.maximum(last_row, first_row)
+
+        count = (table[last_row + 1, last_column + 1] - table[first_row, last_column + 1]
+                 - table[last_row + 1, first_column] + table[first_row, first_column])
+
+        return on_grid & (count > 0)
+
+    def sweep_box(self, start: tuple, end: tuple, size: tuple) -> Optional[tuple]:
+        """Moves a box along a segment and returns the first impassable cell
+        it runs into
+
+        Each impassable cell near the path is grown by the box's size, so
+        the box's centre can stand in for the whole box, the same way
+        projectiles are tested against enemies. A cell the box already
+        overlaps at the start only stops it once its centre enters the
+        cell, so a box that starts against a wall can still move away.
+
+        Args:
+            start (tuple): x/y centre of the box before moving, in pixels
+            end (tuple): x/y centre of the box after moving, in pixels
+            size (tuple): Width/height of the box
+
+        Returns:
+            tuple: (t, row, column) where t in [0, 1] is how far along the
+                   segment the box touched the cell, or None if nothing blocks it
+        """
+        tile_size = self._tile_size
+        half_width, half_height = size[0] / 2, size[1] / 2
+
+        # Only cells the swept box overlaps can be hit
+        first_column = max(int((min(start[0], end[0]) - half_width) // tile_size), 0)
+        last_column = min(int((max(start[0], end[0]) + half_width) // tile_size), self._columns - 1)
+        first_row = max(int((min(start[1], end[1]) - half_height) // tile_size), 0)
+        last_row = min(int((max(start[1], end[1]) + half_height) // tile_size), self._rows - 1)
+
+        grid = self._grid
+        passable = self._passable
+
+        first = None
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                if passable[grid.item(row, column)]:
+                    continue
+
+                left = column * tile_size - half_width
+                top = row * tile_size - half_height
+                right = left + tile_size + size[0]
+                bottom = top + tile_size + size[1]
+
+                if left < start[0] < right and top < start[1] < bottom:
+                    left, top = column * tile_size, row * tile_size
+                    right, bottom = left + tile_size, top + tile_size
+
+                t = segment_box_intersection(start, end, left, top, right, bottom)
+                if t is not None and (first is None or t < first[0]):
+                    first = (t, row, column)
+
+        return first
+
+
+def segment_rect_intersection(start: tuple, end: tuple, rect: pygame.Rect) -> Optional[float]:
+    """Returns where a segment first touches a rect (a slab test)
+
+    Args:
+        start (tuple): x/y start of the segment
+        end (tuple): x/y end of the segment
+        rect (pygame.Rect): The rect to test against
+
+    Returns:
+        float: How far along the segment (0 to 1) it enters the rect,
+               or None if it misses. Starting inside the rect returns 0.
+    """
+    return segment_box_intersection(start, end, rect.left, rect.top, rect.right, rect.bottom)
+
+
+def segment_box_intersection(start: tuple, end: tuple, left: float, top: float,
+                             right: float, bottom: float) -> Optional[float]:
+    """segment_rect_intersection() for a box given by its edges, which may
+    be fractional
+
+    Args:
+        start (tuple): x/y start of the segment
+        end (tuple): x/y end of the segment
+        left, top, right, bottom (float): The edges of the box
+
+    Returns:
+        float: How far along the segment (0 to 1) it enters the box,
+               or None if it misses. Starting inside the box returns 0.
+    """
+    t_enter, t_exit = 0.0, 1.0
+
+    for origin, change, low, high in (
+        (start[0], end[0] - start[0], left, right),
+        (start[1], end[1] - start[1], top, bottom)
+    ):
+        if change == 0:
+            # Parallel to this slab, so it has to already be inside it
+            if origin < low or origin >= high:
+                return None
+            continue
+
+        t_low = (low - origin) / change
+        t_high = (high - origin) / change
+        if t_low > t_high:
+            t_low, t_high = t_high, t_low
+
+        t_enter = max(t_enter, t_low)
+        t_exit = min(t_exit, t_high)
+        if t_enter > t_exit:
+            return None
+
+    return t_enter
@@ -1,5 +1,4 @@
 """This module holds all the classes for Entity and its related subtypes"""
-import math
 import random
 from enum import Enum
 
@@ -10,7 +9,13 @@ from common.item import Item
 from common.inventory import Inventory
 from common.status_effect import StatusEffect
 from common.boots import Boots
-from common import audio, util
+from common.pool import EntityPool
+from common import assets, audio, util
+
+# Picks the look of newly built entities. It is kept apart from the game's
+# random stream so building an entity never changes what a seeded run does;
+# pooled enemies pick their look again from the game's stream in reset()
+_SPRITE_RANDOM = random.Random()
 
 
 class EntityType(Enum):
@@ -36,16 +41,16 @@ class Entity(pygame.sprite.Sprite):
         self._entity_type = entity_type
 
         if entity_type is EntityType.ENEMY:
-            choice = random.choice(entity_type.value)
+            choice = _SPRITE_RANDOM.choice(entity_type.value)
             img_path = util.get_absolute_path_of_asset("images", "sprites", choice + ".png")
 
-            self._image = pygame.image.load(img_path)
+            self._image = assets.load_image(img_path)
             self._rect = pygame.Rect((64, 64), self.image.get_rect().size)
 
         elif entity_type != EntityType.OTHER:
             img_path = util.get_absolute_path_of_asset("images", "sprites", entity_type.value + ".png")
 
-            self._image = pygame.image.load(img_path)
+            self._image = assets.load_image(img_path)
             self._rect = pygame.Rect((64, 64), self.image.get_rect().size)
 
     # Getters
@@ -163,6 +168,15 @@ class Actor(Entity):
 
     # Methods
     # ----------------------------------------------------------------------
+    def reset(self) -> None:
+        """Reset the Actor in place so a pooled instance can be reused"""
+        self._damage_timer = 0
+        self._status_effects = []
+        self._dead = False
+
+        if self._attributes is not None:
+            self._attributes.reset()
+
     def take_damage(self, damage: int, sound_enabled=True) -> None:
         """Causes the Actor to take damage
 
@@ -180,8 +194,7 @@ class Actor(Entity):
                 self._dead = True
 
             if sound_enabled:
-                sound_effect = audio.SoundEffect(audio.SoundEffect.Effect.PAIN01)
-                sound_effect.play()
+                audio.SOUND_BANK.play(audio.SoundEffect.Effect.PAIN01)
 
     def take_healing(self, amount: int, sound_enabled=True) -> None:
         """Heals an entity by an amount
@@ -194,8 +207,7 @@ class Actor(Entity):
             self._attributes.current_hitpoints += amount
 
             if sound_enabled:
-                sound_effect = audio.SoundEffect(audio.SoundEffect.Effect.HEAL01)
-                sound_effect.play()
+                audio.SOUND_BANK.play(audio.SoundEffect.Effect.HEAL01)
 
     def inc_speed(self, amount):
         self.attributes.current_speed += amount
@@ -371,23 +383,19 @@ class Player(Actor):
 
     # Methods
     # ----------------------------------------------------------------------
-    def generate_attack(self, direction: tuple, angle: float) -> 'Projectile':
-        """Create a projectile and return it
+    def generate_attack(self, direction: tuple, angle: float, projectiles) -> None:
+        """Fire a projectile from the player's weapon
 
         Args:
             direction (tuple): Direction to send the projectile
-
-        Returns:
-            Projectile: A newly created projectile
+            angle (float): The angle the projectile is fired at
+            projectiles (ProjectileBuffer): Where the projectile is added
         """
-
-        # Set relative position
-        proj = self._inventory.weapon.generate_projectile(direction, angle, self._attributes.current_strength)
-        proj.coords = self.coords
+        self._inventory.weapon.generate_projectile(
+            projectiles, self.coords, direction, angle, self._attributes.current_strength
+        )
         self._shot_timer = 15
 
-        return proj
-
     def update_player_attributes(self):
         if self._inventory.boots.applied is False:
             new_base_strength = self._inventory.boots.strength_buff + self.attributes.current_strength
@@ -436,7 +444,8 @@ class Enemy(Actor):
         self._damage_delta = 5
         self._attributes = ActorAttributes(10, 100, 10, 4)
         self._distance = 128
-        self._direction = random.randrange(8)
+        # Pooled enemies get their direction from reset()
+        self._direction = 0
         self._triggered = False
         self._charge_speed = 3
         self._trigger_range = 110
@@ -462,6 +471,25 @@ class Enemy(Actor):
     def get_charge_speed(self):
         return self._charge_speed
 
+    def get_trigger_range(self):
+        return self._trigger_range
+
+    def reset(self) -> None:
+        """Reset the Enemy in place so a pooled instance can be reused"""
+        super().reset()
+        self._distance = 128
+        self._direction = random.randrange(8)
+        self._triggered = False
+
+        if self._entity_type is EntityType.ENEMY:
+            # The look decides the size of the rect, so it is picked from
+            # the game's random stream like the rest of the enemy
+            choice = random.choice(EntityType.ENEMY.value)
+            img_path = util.get_absolute_path_of_asset("images", "sprites", choice + ".png")
+
+            self._image = assets.load_image(img_path)
+            self._rect = pygame.Rect((64, 64), self.image.get_rect().size)
+
     def get_new_direction(self):
         """ sets new direction for enemy to follow 1 is down 2 is up
         3 is right 4 is left also resets distance to 4 tiles"""
@@ -469,106 +497,31 @@ class Enemy(Actor):
         self.set_direction(select_move)
         self._distance = 256
 
-    def check_for_trigger(self, player: Actor):
-        dx = player.rect.x - self.rect.x
-        dy = player.rect.y - self.rect.y
-        dist = math.hypot(dx, dy)
-        if dist <= self._trigger_range:
-            self._triggered = True
-        else:
-            self._triggered = False
-
 
 class Boss(Enemy):
     def __init__(self):
         super().__init__(EntityType.BOSS)
         self._damage_delta = 2
         self._attributes = ActorAttributes(10, 1000, 30,4)
-        self._image = pygame.transform.scale(self.image, (64, 64))
-        self._rect = self._rect = pygame.Rect((64, 64), self.image.get_rect().size)
+        img_path = util.get_absolute_path_of_asset("images", "sprites", EntityType.BOSS.value + ".png")
+        self._image = assets.load_image(img_path, scale=(64, 64))
+        self._rect = pygame.Rect((64, 64), self.image.get_rect().size)
         self._trigger_range = 300
         self._charge_speed = 4
+        self._direction = random.randrange(8)
 
 
-class Projectile(Entity):
-    """Class representing a Projectile
-
-    Args:
-        speed (tuple): A normalized direction vector
-        damage (int): The damage the projectile will do
-
-    Attributes:
-        _speed (tuple): The speed of the projectile
-        _damage (int): The damage of the projectile
-        _range (int): The range of the projectile
-    """
-    def __init__(self, speed: tuple, damage: int, angle: float) -> None:
-        super().__init__(EntityType.OTHER)
-
-        self._speed = speed
-        self._damage = damage
-        self._angle = angle
-
-        # Range is n blocks * tile_size
-        # This projectile travels 10 blocks
-        self._range = 10*32
-
-        # The projectile's image is currently a green square
-        img_path = util.get_absolute_path_of_asset("images", "tiles", "arrow.png")
-        self._original_image = pygame.image.load(img_path)
-        self._image = pygame.transform.rotate(self._original_image, angle)
-        self._rect = self._image.get_rect()
-
-    # Getters
-    # ----------------------------------------------------------------------
-    def get_speed(self) -> tuple:
-        """Return the projectile's speed
-
-        Returns:
-            tuple: The projectile's speed
-        """
-        return self._speed
-
-    def get_damage(self) -> int:
-        """Return the projectile's damage
-
-        Returns:
-            int: The projectile's damage
-        """
-        return self._damage
-
-    # Properties
-    # ----------------------------------------------------------------------
-    speed = property(get_speed)
-    damage = property(get_damage)
-
-    # Methods
-    # ----------------------------------------------------------------------
-    def is_out_of_range(self) -> bool:
-        """Returns if the projectile is out of range
-
-        Returns:
-            bool: If the projectile is out of range
-        """
-        return self._range <= 0
+class DroppedItem(Entity):
+    def __init__(self, item):
+        super().__init__(EntityType.ITEM)
+        self._item = item
 
-    def update_position(self, speed: tuple) -> None:
-        """Updates the projectile's position
+    def reset(self, item) -> None:
+        """Reset the dropped item in place so a pooled instance can be reused
 
         Args:
-            change (tuple): The change in x/y coordinate
-
+            item (Item): The item within the DroppedItem entity
         """
-        self._rect.x += speed[0]
-        self._rect.y += speed[1]
-
-        self._range -= math.sqrt(pow(speed[0], 2) + pow(speed[1], 2))
-        self._range = max(self._range, 0)
-
-
-class DroppedItem(Entity):
-    def __init__(self, item):
-        super().__init__(EntityType.ITEM)
         self._item = item
 
     def get_item(self) -> Item:
@@ -578,3 +531,9 @@ class DroppedItem(Entity):
             Item: The item within the DroppedItem entity
         """
         return self._item
+
+
+# Shared pools, so spawning and killing reuse instances instead of
+# rebuilding them (and reloading their images) during combat
+ENEMY_POOL = EntityPool(Enemy)
+DROPPED_ITEM_POOL = EntityPool(lambda: DroppedItem(None))
@@ -0,0 +1,217 @@
+"""Flow field that leads enemies around walls to the player
+
+A breadth-first search spreads out from the player's tile over the room's
+passable tiles, and every tile then points at whichever neighbour is
+closest to the player. Finding the way from any tile costs one lookup,
+and the search only runs again when the player moves to another tile.
+
+Enemies wider than a tile get a field of their own that only passes
+through gaps they fit in.
+"""
+from collections import deque
+from typing import Optional
+
+import numpy as np
+
+from common.collision import TILE_SIZE
+
+# Distance of tiles the player's tile cannot be reached from
+UNREACHABLE = np.iinfo(np.int32).max
+
+# Orthogonal neighbours are listed first, so that on equal distances the
+# straight step wins over the diagonal one
+NEIGHBOR_STEPS = ((0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (1, -1), (-1, -1), (-1, 1))
+
+
+class FlowField:
+    """Distances to a target tile and the step to take from every tile
+
+    Distances are counted in orthogonal steps, so a diagonal neighbour
+    that is closer is two steps closer and is preferred. Diagonal steps
+    that would cut the corner of a wall are never taken.
+
+    With a clearance above one, each tile stands for the square block of
+    tiles it is the top left of, and only blocks that are entirely
+    passable are walked through.
+
+    Args:
+        clearance (int): Width, in tiles, of the entities the field is for
+
+    Attributes:
+        _clearance (int): Width, in tiles, of the entities the field is for
+        _room (Room): The room the field was built for
+        _target (tuple): The (row, column) the field leads to
+        _distance (ndarray): Steps from each tile to the target
+        _steps (ndarray): The (column, row) step to take from each tile, 0 where there is none
+    """
+    def __init__(self, clearance: int = 1) -> None:
+        self._clearance = clearance
+        self._room = None
+        self._target = None
+        self._distance: np.ndarray = None
+        self._steps: np.ndarray = None
+
+    # Getters
+    # ----------------------------------------------------------------------
+    def get_clearance(self) -> int:
+        """Return the width, in tiles, of the entities the field is for"""
+        return self._clearance
+
+    def get_target(self) -> Optional[tuple]:
+        """Return the (row, column) the field leads to"""
+        return self._target
+
+    def get_distance(self) -> np.ndarray:
+        """Return the steps from each tile to the target, UNREACHABLE for walls
+        and cut-off tiles"""
+        return self._distance
+
+    def get_steps(self) -> np.ndarray:
+        """Return the (column, row) step towards the target from each tile"""
+        return self._steps
+
+    def get_step(self, row: int, column: int) -> tuple:
+        """Return the (column, row) step towards the target from a tile
+
+        Args:
+            row (int): The row of the tile
+            column (int): The column of the tile
+
+        Returns:
+            tuple: The step, (0, 0) on the target or where it can't be reached
+        """
+        step = self._steps[row, column]
+        return (int(step[0]), int(step[1]))
+
+    # Properties
+    # ----------------------------------------------------------------------
+    clearance = property(get_clearance)
+    target = property(get_target)
+    distance = property(get_distance)
+    steps = property(get_steps)
+
+    # Methods
+    # ----------------------------------------------------------------------
+    def update(self, room, position: tuple) -> bool:
+        """Point the field at the tile a position is in, rebuilding it only if
+        the room or the tile changed
+
+        Args:
+            room (Room): The room to path through
+            position (tuple): x/y position of the target, in pixels
+
+        Returns:
+            bool: Whether the field was rebuilt
+        """
+        rows, columns = room.get_grid().shape
+        target = (min(max(int(position[1]) // TILE_SIZE, 0), rows - 1),
+                  min(max(int(position[0]) // TILE_SIZE, 0), columns - 1))
+
+        if room is self._room and target == self._target:
+            return False
+
+        self._room = room
+        self._target = target
+        self.build(room.get_passable_mask(), target)
+        return True
+
+    def get_open_blocks(self, passable: np.ndarray) -> np.ndarray:
+        """Return which tiles are the top left of a clear block of clearance tiles
+
+        Args:
+            passable (ndarray): The room's boolean passable mask
+
+        Returns:
+            ndarray: A boolean per tile, False where the block runs off the grid
+        """
+        clearance = self._clearance
+        if clearance == 1:
+            return passable
+
+        rows, columns = passable.shape
+        blocks = np.zeros_like(passable)
+        inner = blocks[:rows - clearance + 1, :columns - clearance + 1]
+        inner[...] = True
+
+        for row_offset in range(clearance):
+            for column_offset in range(clearance):
+                inner &= passable[row_offset:row_offset + inner.shape[0], column_offset:column_offset + inner.shape[1]]
+
+        return blocks
+
+    def build(self, passable: np.ndarray, target: tuple) -> None:
+        """Search out from a tile and work out every tile's step
+
+        Args:
+            passable (ndarray): The room's boolean passable mask
+            target (tuple): The (row, column) to lead to
+        """
+        rows, columns = passable.shape
+        blocks = self.get_open_blocks(passable)
+
+        # Breadth-first search over a flat copy of the grid with a border of
+        # wall around it, so neighbours never need bounds checks. Walls start
+        # at -1, so one comparison finds the tiles still to visit
+        stride = columns + 2
+        distance = np.pad(np.where(blocks, UNREACHABLE, -1), 1, constant_values=-1).ravel().tolist()
+        queue = deque()
+
+        # Start from every open block that covers the target
+        for row in range(max(target[0] - self._clearance + 1, 0), target[0] + 1):
+            for column in range(max(target[1] - self._clearance + 1, 0), target[1] + 1):
+                if blocks[row, column] or (row, column) == target:
+                    start = (row + 1) * stride + column + 1
+                    distance[start] = 0
+                    queue.append(start)
+
+        while queue:
+            cell = queue.popleft()
+            next_distance = distance[cell] + 1
+
+            for neighbor in (cell - stride, cell + stride, cell - 1, cell + 1):
+                if distance[neighbor] == UNREACHABLE:
+                    distance[neighbor] = next_distance
+                    queue.append(neighbor)
+
+        distance = np.array(distance, dtype=np.int32).reshape(rows + 2, stride)[1:-1, 1:-1]
+        self._distance = np.where(distance < 0, UNREACHABLE, distance)
+        self._steps = self.get_downhill_steps(self._distance, blocks)
+
+    @staticmethod
+    def get_downhill_steps(distance: np.ndarray, passable: np.ndarray) -> np.ndarray:
+        """Return, for every tile, the step to its closest neighbour
+
+        Args:
+            distance (ndarray): Steps from each tile to the target
+            passable (ndarray): Which tiles can be walked through
+
+        Returns:
+            ndarray: A (rows, columns, 2) array of (column, row) steps
+        """
+        rows, columns = distance.shape
+
+        # Pad by a tile so every neighbour lookup stays in range
+        padded_distance = np.pad(distance, 1, constant_values=UNREACHABLE)
+        padded_passable = np.pad(passable, 1, constant_values=False)
+
+        def shifted(array: np.ndarray, step: tuple) -> np.ndarray:
+            return array[1 + step[1]:1 + step[1] + rows, 1 + step[0]:1 + step[0] + columns]
+
+        best = distance.copy()
+        steps = np.zeros((rows, columns, 2), dtype=np.int8)
+
+        for step in NEIGHBOR_STEPS:
+            neighbor_distance = shifted(padded_distance, step)
+
+            if step[0] and step[1]:
+                # Both tiles beside the diagonal must be open
+                neighbor_distance = np.where(
+                    shifted(padded_passable, (step[0], 0)) & shifted(padded_passable, (0, step[1])),
+                    neighbor_distance, UNREACHABLE
+                )
+
+            closer = neighbor_distance < best
+            best = np.where(closer, neighbor_distance, best)
+            steps[closer] = step
+
+        return steps
@@ -1,23 +1,52 @@
 """Class which runs the game"""
 
+import math
+import time
 import pygame
+from common import audio
+from common.input import PygameInputProvider
+from common.leaderboard import ScoreEntry, get_leaderboard
+from common.replay import ReplayRecorder
 from common.scene import Scene
 from common.state import State
 
 
 class Game:
     """Class representing the game
+
+    Args:
+        dirty_rects (bool): Only repaint the parts of the window that changed
+                            each frame, for low-end and software-rendered displays
+        replay_path (str): If given, the session is recorded and saved there
+                           as a replay when the game quits
+
     Attributes:
         scene (Scene): Scene represening the game window
         state (State): The current state of the game
-        fps (int): Frames per second
+        fps (int): Most frames to render per second, 0 for no limit
+        tick_rate (int): Simulation ticks per second of game time
+        sim_speed (float): How fast game time runs compared to real time
+        max_catch_up (int): Most ticks to run in one frame at normal speed
+        warm_up_margin (float): Seconds of each frame left unused by the
+                                warm-up of neighbouring rooms
+        accumulator (float): Game time, in seconds, not yet simulated
+        clock (Clock): Paces the main loop to the frame rate
         running (bool): Whether the game is running or not
     """
-    def __init__(self) -> None:
-        self._scene = Scene(1280, 768)
+    def __init__(self, dirty_rects: bool = False, replay_path: str = None) -> None:
+        self._scene = Scene(1280, 768, dirty_rects)
 
-        self._state = State()
+        self._replay_path = replay_path
+        self._recorder = ReplayRecorder(PygameInputProvider()) if replay_path else None
+
+        self._state = State(self._recorder)
         self._fps = 60
+        self._tick_rate = 60
+        self._sim_speed = 1.0
+        self._max_catch_up = 5
+        self._warm_up_margin = 0.004
+        self._accumulator = 0.0
+        self._clock = pygame.time.Clock()
         self._running = False
         # self._started = False
 
@@ -26,6 +55,9 @@ class Game:
         pygame.init()
         self._running = True
 
+        # Decode every sound effect before gameplay starts
+        audio.SOUND_BANK.preload()
+
         # Set the window title
         pygame.display.set_caption("Agile Dungeon")
 
@@ -33,34 +65,109 @@ class Game:
         # main_menu = menu.Menu((1280, 768))
 
         # Main game loop
+        self._clock.tick()
         while self._running:
-            # Tick the clock forward how ever many fps
-            pygame.time.Clock().tick(self._fps)
+            # Check for start, quit, or pause
+            self.handle_events()
 
-            self._state.update()
+            # Run however many fixed ticks the real time since the last
+            # frame covers, then draw the result once
+            elapsed = self._clock.tick(self._fps) / 1000
+            frame_start = time.perf_counter()
+            self.update_simulation(elapsed)
             self._scene.draw_state(self._state)
 
-            # Flip the display
-            pygame.display.flip()
+            # Flip the display (or just its changed regions)
+            self._scene.present()
 
-            # Check for start, quit, or pause
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self._running = False
-                if event.type == pygame.KEYDOWN:
-                    if self._state.started is False:
-                        self._state.started = True
-                        self._state.paused = False
-                    if self._state.game_is_over():
-                        self._scene.menu.update_high_scores(self._state.get_score())
-                        self._state.paused = False
-                        self._state.spawn()
-                        self._state.enter_new_dungeon()
-                    if event.key == pygame.K_p:
-                        self._state.paused = not self._state.paused
-        self._scene.menu.update_high_scores(self._state.get_score())
+            # Spend what is left of the frame getting the next rooms ready
+            if self._fps:
+                self._state.warm_up_rooms(frame_start + 1 / self._fps - self._warm_up_margin)
+
+        if self._state.started and self._state.get_score() > 0:
+            self.record_score()
+
+        # Let queued scores reach the disk before exiting
+        get_leaderboard().close()
+
+        if self._recorder is not None:
+            self._recorder.get_replay().save(self._replay_path)
         pygame.quit()
 
+    def update_simulation(self, elapsed: float) -> int:
+        """Advance the state by fixed ticks to cover some real time
+
+        Each tick is 1 / tick_rate seconds of game time, scaled by the sim
+        speed. Time left over is carried to the next frame. If the game
+        falls too far behind, the extra ticks are dropped so a slow frame
+        cannot snowball into slower ones.
+
+        Args:
+            elapsed (float): Real seconds since the last call
+
+        Returns:
+            int: The number of ticks run
+        """
+        tick_length = 1 / self._tick_rate
+        max_ticks = math.ceil(self._max_catch_up * self._sim_speed)
+
+        self._accumulator += elapsed * self._sim_speed
+
+        ticks = 0
+        while self._accumulator >= tick_length and ticks < max_ticks:
+            self._state.update()
+            self._accumulator -= tick_length
+            ticks += 1
+
+        if ticks == max_ticks:
+            # Too far behind, so give up on the backlog
+            self._accumulator %= tick_length
+
+        return ticks
+
+    def handle_events(self) -> None:
+        """React to the start, pause and quit keys"""
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self._running = False
+            if event.type == pygame.KEYDOWN:
+                if self._state.started is False:
+                    self._state.started = True
+                    self._state.paused = False
+                if self._state.game_is_over():
+                    self.record_score()
+                    self._state.paused = False
+                    self._state.spawn()
+                    self._state.enter_new_dungeon()
+                if event.key == pygame.K_p:
+                    self._state.paused = not self._state.paused
+
+    def record_score(self) -> None:
+        """Add the current run to the leaderboard, without waiting on the disk"""
+        get_leaderboard().add(ScoreEntry(
+            score=self._state.get_score(),
+            floor=self._state.get_room_count(),
+            kills=self._state.get_kills(),
+            seed=self._state.get_seed()
+        ))
+
+    def get_sim_speed(self) -> float:
+        """Return how fast game time runs compared to real time"""
+        return self._sim_speed
+
+    def set_sim_speed(self, sim_speed: float) -> None:
+        """Set how fast game time runs compared to real time
+
+        Args:
+            sim_speed (float): 1 for normal speed, above 1 to fast-forward
+        """
+        if sim_speed <= 0:
+            raise Exception("Invalid sim speed: " + str(sim_speed))
+
+        self._sim_speed = sim_speed
+
+    sim_speed = property(get_sim_speed, set_sim_speed)
+
     def has_started(self) -> bool:
         """Check if the game has started.
         Returns:
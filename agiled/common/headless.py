@@ -0,0 +1,136 @@
+"""Runs the simulation without a display, mixer or input devices
+
+Usage, from the agiled directory:
+    python -m common.headless --ticks 10000
+"""
+import argparse
+import time
+
+from common import audio
+from common.input import BotInputProvider, InputProvider, ScriptedInputProvider
+from common.state import State
+
+
+class HeadlessRunner:
+    """Steps a State as fast as the CPU allows, with no Scene
+
+    Audio is switched to the null backend and input is injected, so this
+    runs on machines without a display or sound card. When the player dies
+    the run respawns them in a new dungeon, like pressing a key on the game
+    over screen does, unless respawning is turned off.
+
+    Args:
+        input_provider (InputProvider): Drives the player, an idle
+                                        ScriptedInputProvider if None
+        seed (int): Seed for the run, a random one if None
+        respawn (bool): Whether to start a new dungeon when the player dies,
+                        instead of leaving the state on the game over screen
+
+    Attributes:
+        state (State): The simulated game state
+        ticks (int): Ticks simulated so far
+        deaths (int): Times the player has died
+        elapsed (float): Wall-clock seconds spent simulating
+    """
+    def __init__(self, input_provider: InputProvider = None, seed: int = None, respawn: bool = True) -> None:
+        audio.use_null_backend()
+
+        self._input = input_provider if input_provider is not None else ScriptedInputProvider()
+        self._state = State(self._input, seed)
+        self._state.started = True
+        self._state.paused = False
+
+        self._respawn = respawn
+        self._ticks = 0
+        self._deaths = 0
+        self._elapsed = 0.0
+
+    # Getters
+    # ----------------------------------------------------------------------
+    def get_state(self) -> State:
+        """Return the simulated state"""
+        return self._state
+
+    def get_input(self) -> InputProvider:
+        """Return the input provider the player is driven by"""
+        return self._input
+
+    def get_ticks(self) -> int:
+        """Return the number of ticks simulated so far"""
+        return self._ticks
+
+    def get_deaths(self) -> int:
+        """Return how many times the player has died"""
+        return self._deaths
+
+    def get_ticks_per_second(self) -> float:
+        """Return the simulation rate so far, in ticks per wall-clock second"""
+        return self._ticks / self._elapsed if self._elapsed else 0.0
+
+    # Properties
+    # ----------------------------------------------------------------------
+    state = property(get_state)
+    input = property(get_input)
+    ticks = property(get_ticks)
+    deaths = property(get_deaths)
+    ticks_per_second = property(get_ticks_per_second)
+
+    # Methods
+    # ----------------------------------------------------------------------
+    def step(self) -> None:
+        """Simulate one tick, respawning the player if they died"""
+        state = self._state
+
+        state.update()
+        self._ticks += 1
+
+        if state.game_is_over() and self._respawn:
+            self._deaths += 1
+            state.paused = False
+            state.spawn()
+            state.enter_new_dungeon()
+
+    def run(self, ticks: int) -> float:
+        """Simulate some ticks as fast as possible
+
+        Args:
+            ticks (int): How many ticks to simulate
+
+        Returns:
+            float: The ticks per second achieved by this run
+        """
+        start = time.perf_counter()
+
+        for _ in range(ticks):
+            self.step()
+
+        elapsed = time.perf_counter() - start
+        self._elapsed += elapsed
+
+        return ticks / elapsed if elapsed else 0.0
+
+    def get_report(self) -> str:
+        """Return a one-line summary of the run so far"""
+        state = self._state
+        return "{} ticks in {:.2f}s ({:.0f} ticks/s), floor {}, score {}, kills {}, deaths {}".format(
+            self._ticks, self._elapsed, self.get_ticks_per_second(),
+            state.get_room_count(), state.get_score(), state.get_kills(), self._deaths
+        )
+
+
+def main() -> None:
+    """Run a headless simulation from the command line and print its rate"""
+    parser = argparse.ArgumentParser(description="Run Agile Dungeon without a display")
+    parser.add_argument("--ticks", type=int, default=10000, help="Ticks to simulate")
+    parser.add_argument("--bot", action="store_true", help="Let a bot play instead of idling")
+    parser.add_argument("--bot-seed", type=int, default=None, help="Seed for the bot's choices")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the dungeon")
+    args = parser.parse_args()
+
+    runner = HeadlessRunner(BotInputProvider(args.bot_seed) if args.bot else None, args.seed)
+    runner.run(args.ticks)
+    print(runner.get_report())
+
+
+if __name__ == "__main__":
+    main()
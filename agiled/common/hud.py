@@ -1,12 +1,29 @@
 """Implements the UI overlay that goes on top of the room scene."""
+from typing import List
 import pygame
 import pygame.freetype
 from common import util
 
+# Rendered text surfaces kept before the cache is emptied
+TEXT_CACHE_LIMIT = 512
+
 
 class HeadsUpDisplay():
-    """Class representing a display for the current health, strength, and defense"""
-    def __init__(self):
+    """Class representing a display for the current health, strength, and defense
+
+    The HUD keeps its own transparent layer. Each widget remembers the value
+    it was last drawn with and is only re-rendered into the layer when that
+    value changes, so a normal frame is just a blit of the layer.
+
+    Args:
+        size (tuple): Width/height of the window the HUD is drawn over
+
+    Attributes:
+        _layer (Surface): The rendered widgets, on a transparent background
+        _text_cache (dict): Rendered text surfaces keyed on (font, text, size, color)
+        _widgets (dict): Per widget, the value it was drawn with and the rects it covers
+    """
+    def __init__(self, size: tuple = (1280, 768)):
         # Load up UI fonts
         self._font_icon_solid = pygame.freetype.Font(
             util.get_absolute_path_of_asset("other", "fonts", "fa-solid-900.ttf")
@@ -18,99 +35,209 @@ class HeadsUpDisplay():
             util.get_absolute_path_of_asset("other", "fonts", "Macondo-Regular.ttf")
             )
 
+        self._heart_offset = self._font_icon_regular.get_rect("\uf004", size=24).x + 30
+
+        self._layer = pygame.Surface(size, pygame.SRCALPHA)
+        self._text_cache = {}
+        self._widgets = {}
+
+    def render_text(self, font: pygame.freetype.Font, text: str, size: int, color: tuple = None) -> tuple:
+        """Return a rendered piece of text, rasterizing it only the first time
+
+        Args:
+            font (Font): The font to render with
+            text (str): The text to render
+            size (int): The font size
+            color (tuple, optional): The text color, the font's default if None
+
+        Returns:
+            tuple: The shared text Surface and its rect relative to the origin
+        """
+        key = (font, text, size, color)
+
+        rendered = self._text_cache.get(key)
+        if rendered is None:
+            if len(self._text_cache) >= TEXT_CACHE_LIMIT:
+                self._text_cache.clear()
+
+            if color is None:
+                rendered = font.render(text, size=size)
+            else:
+                rendered = font.render(text, size=size, fgcolor=color)
+            self._text_cache[key] = rendered
+
+        return rendered
+
+    def blit_text(self, window, pos: tuple, font: pygame.freetype.Font, text: str, size: int,
+                  color: tuple = None) -> pygame.Rect:
+        """Draw cached text the same way Font.render_to would
+
+        Returns:
+            Rect: The rect that was drawn to
+        """
+        return window.blit(self.render_text(font, text, size, color)[0], pos)
+
     def draw_health(self, window, posx: int, posy: int, current_hit_points: int, max_hit_points: int, hearts: int):
         """Draw the health bar to the HUD
 
         Args:
-            window ([type]): [description]
-            posx (int): [description]
-            posy (int): [description]
+            window (Surface): The surface to draw to
+            posx (int): Left edge of the first heart
+            posy (int): Top edge of the hearts
             current_hit_points (int): Current player hitpoints
             max_hit_points (int): Maximum player hitpoints
             hearts (int): Maximum number of hearts to display on screen
+
+        Returns:
+            list: The rects that were drawn to
         """
         # Draws player health as a row of hearts. Hearts are three-state: full, broken, or empty.
         health_per_heart = max_hit_points / hearts
         health_broken = max_hit_points / 2
 
-        heart_dims = self._font_icon_regular.get_rect("\uf004", size=24)
-        heart_offset = heart_dims.x + 30
-
         # How many hearts do we need?
         full_hearts = (int)(current_hit_points / health_per_heart)
         any_extra = current_hit_points - (full_hearts * health_per_heart)
         empty_hearts = hearts - (full_hearts + (1 if any_extra > 0 else 0))
 
+        rects = []
+
         # Draw hearts
         for _ in range(full_hearts):
-            self._font_icon_solid.render_to(window, (posx, posy), "\uf004", size=24, fgcolor=(255, 23, 40, 255))
-            posx += heart_offset
+            rects.append(self.blit_text(window, (posx, posy), self._font_icon_solid, "\uf004", 24, (255, 23, 40, 255)))
+            posx += self._heart_offset
 
         if any_extra > 0:
             if any_extra > health_broken:
-                self._font_icon_solid.render_to(window, (posx, posy), "\uf004", size=24, fgcolor=(255, 23, 40, 255))
+                rects.append(self.blit_text(window, (posx, posy), self._font_icon_solid, "\uf004", 24, (255, 23, 40, 255)))
             else:
-                self._font_icon_solid.render_to(window, (posx, posy), "\uf7a9", size=24, fgcolor=(128, 12, 20, 255))
+                rects.append(self.blit_text(window, (posx, posy), self._font_icon_solid, "\uf7a9", 24, (128, 12, 20, 255)))
 
-            posx += heart_offset
+            posx += self._heart_offset
 
         for _ in range(empty_hearts):
-            self._font_icon_regular.render_to(window, (posx, posy), "\uf004", size=24, fgcolor=(10, 10, 10, 255))
-            posx += heart_offset
+            rects.append(self.blit_text(window, (posx, posy), self._font_icon_regular, "\uf004", 24, (10, 10, 10, 255)))
+            posx += self._heart_offset
 
-    def draw_overlay(self, window, state):
-        """Draws the overlay, reading data from State (eventually)"""
-        player_atts = state.player.attributes
+        return rects
+
+    def get_widgets(self, state) -> list:
+        """Return each widget's name, current value and draw function
+
+        A widget is re-rendered whenever its value differs from the one it
+        was last drawn with.
+        """
+        player = state.player
+        player_atts = player.attributes
+        hotbar = player.inventory.hotbar
+
+        return [
+            ("health", player_atts.current_hitpoints,
+             lambda layer: self.draw_health(layer, 20, 20, player_atts.current_hitpoints, 100, 10)),
+            ("strength", player_atts.current_strength,
+             lambda layer: [self.blit_text(layer, (20, 50), self._font_text,
+                                           "strength " + str(player_atts.current_strength), 24)]),
+            ("defense", player_atts.current_defense,
+             lambda layer: [self.blit_text(layer, (20, 80), self._font_text,
+                                           "defense " + str(player_atts.current_defense), 24)]),
+            ("speed", player_atts.current_speed,
+             lambda layer: [self.blit_text(layer, (20, 110), self._font_text,
+                                           "speed " + str(player_atts.current_speed), 24)]),
+            ("score", state.get_score(),
+             lambda layer: [self.blit_text(layer, (20, 745), self._font_text,
+                                           "Score: " + str(state.get_score()), 24)]),
+            ("status_effects", tuple(str(effect) for effect in player.status_effects),
+             lambda layer: self.draw_status_effects(layer, state)),
+            ("inventory", tuple(str(item[0]) if item else None for item in hotbar),
+             lambda layer: self.draw_inventory(layer, state)),
+            ("weapon", str(player.get_weapon()),
+             lambda layer: self.draw_weapon_info(layer, state)),
+            ("boots", str(player.get_boots()),
+             lambda layer: self.draw_boot_info(layer, state)),
+            ("floor", state.get_room_count(),
+             lambda layer: self.draw_floor_count(layer, state)),
+        ]
+
+    def update(self, state) -> List[pygame.Rect]:
+        """Re-render the widgets whose values changed since the last update
+
+        Returns:
+            list: The window regions that changed, covering both the old and
+                  the new extent of each re-rendered widget
+        """
+        changed = []
+
+        for name, value, draw in self.get_widgets(state):
+            previous = self._widgets.get(name)
+            if previous is not None and previous[0] == value:
+                continue
 
-        self.draw_health(window, 20, 20, player_atts.current_hitpoints, 100, 10)
+            old_rects = previous[1] if previous is not None else []
+            for rect in old_rects:
+                self._layer.fill((0, 0, 0, 0), rect)
 
-        self._font_text.render_to(window, (20, 50), "strength " + str(player_atts.current_strength), size=24)
-        self._font_text.render_to(window, (20, 80), "defense " + str(player_atts.current_defense), size=24)
-        self._font_text.render_to(window, (20, 110), "speed " + str(player_atts.current_speed), size=24)
-        self._font_text.render_to(window, (20, 745), "Score: " + str(state.get_score()), size=24)
+            new_rects = draw(self._layer)
+            self._widgets[name] = (value, new_rects)
+            changed += old_rects + new_rects
 
-        self.draw_status_effects(window, state)
-        self.draw_inventory(window, state)
-        self.draw_weapon_info(window, state)
-        self.draw_boot_info(window, state)
-        self.draw_floor_count(window, state)
+        return changed
+
+    def draw(self, window) -> List[pygame.Rect]:
+        """Blit the HUD layer to the window
+
+        Returns:
+            list: The rects that were drawn to
+        """
+        rects = [rect for _, widget_rects in self._widgets.values() for rect in widget_rects]
+        window.blits([(self._layer, rect, rect) for rect in rects], doreturn=False)
+        return rects
+
+    def draw_overlay(self, window, state):
+        """Draws the overlay, reading data from State
+
+        Returns:
+            list: The rects that were drawn to
+        """
+        self.update(state)
+        return self.draw(window)
 
     def draw_status_effects(self, window, state):
         """Draws the currently active status effects"""
         status_effects = state.player.status_effects
         offset = 0
+        rects = []
 
         for effect in status_effects:
             offset += 20
-            self._font_text.render_to(window, (1100, offset), str(effect), size=20)
+            rects.append(self.blit_text(window, (1100, offset), self._font_text, str(effect), 20))
+
+        return rects
 
     def draw_inventory(self, window, state):
         """Draws the player's inventory"""
         hotbar = state.player.inventory.hotbar
 
         offset = 150
+        rects = []
         for index, item in enumerate(hotbar):
             offset += 20
             if item:
-                self._font_text.render_to(window, (20, offset), "{}: {}".format(index + 1, item[0]), size=20)
+                rects.append(self.blit_text(window, (20, offset), self._font_text, "{}: {}".format(index + 1, item[0]), 20))
             else:
-                self._font_text.render_to(window, (20, offset), "{}: {}".format(index + 1, "empty"), size=20)
+                rects.append(self.blit_text(window, (20, offset), self._font_text, "{}: {}".format(index + 1, "empty"), 20))
 
-    def draw_boot_info(self, window, state):
-        weapon = state.player.get_boots()
-        offset = 325
-        self._font_text.render_to(window, (20,offset), str(weapon), size=20)
+        return rects
 
     def draw_boot_info(self, window, state):
         weapon = state.player.get_boots()
         offset = 325
-        self._font_text.render_to(window, (20,offset), str(weapon), size=20)
+        return [self.blit_text(window, (20, offset), self._font_text, str(weapon), 20)]
 
     def draw_weapon_info(self, window, state):
         weapon = state.player.get_weapon()
         offset = 300
-        self._font_text.render_to(window, (20,offset), str(weapon), size=20)
+        return [self.blit_text(window, (20, offset), self._font_text, str(weapon), 20)]
 
     def draw_floor_count(self, window, state):
         room_count = state.get_room_count()
-        self._font_text.render_to(window, (1280/2 - 50, 20), "Floor: " + str(room_count), size=30)
+        return [self.blit_text(window, (1280/2 - 50, 20), self._font_text, "Floor: " + str(room_count), 30)]
@@ -0,0 +1,190 @@
+"""Sources of player input that State reads from
+
+State asks its InputProvider for one InputSnapshot at the start of every
+tick and reads nothing else, so live play, bots and recordings all drive
+the game the same way.
+"""
+from abc import ABC, abstractmethod
+import random
+from typing import Callable, Iterable, NamedTuple, Optional
+
+import pygame
+from pygame.locals import K_w, K_s, K_a, K_d, K_1, K_2, K_3, K_4, K_5
+
+# Keys that use each hotbar slot, in slot order
+ITEM_KEYS = (K_1, K_2, K_3, K_4, K_5)
+
+
+class InputSnapshot(NamedTuple):
+    """The player's input for one tick
+
+    Attributes:
+        move_x (int): -1 to move left, 1 to move right, 0 to stay
+        move_y (int): -1 to move up, 1 to move down, 0 to stay
+        fire (bool): Whether the fire button is held
+        aim (tuple): The x/y window position being aimed at
+        item_slot (int): The hotbar slot to use, or None
+    """
+    move_x: int = 0
+    move_y: int = 0
+    fire: bool = False
+    aim: tuple = (0, 0)
+    item_slot: Optional[int] = None
+
+
+# A tick with nothing pressed
+IDLE_SNAPSHOT = InputSnapshot()
+
+
+class InputProvider(ABC):
+    """Delivers one InputSnapshot per tick"""
+    def attach(self, state) -> None:
+        """Called once by the State the provider is given to, before any tick
+
+        Args:
+            state (State): The state that will poll the provider
+        """
+        pass
+
+    @abstractmethod
+    def poll(self, state) -> InputSnapshot:
+        """Return the input for the coming tick
+
+        Args:
+            state (State): The state about to be updated
+
+        Returns:
+            InputSnapshot: The input for the tick
+        """
+        raise NotImplementedError
+
+
+class PygameInputProvider(InputProvider):
+    """Samples the live keyboard and mouse through pygame, once per tick"""
+    def poll(self, state) -> InputSnapshot:
+        keys = pygame.key.get_pressed()
+
+        item_slot = None
+        for slot, key in enumerate(ITEM_KEYS):
+            if keys[key]:
+                item_slot = slot
+                break
+
+        # Opposite keys cancel out
+        return InputSnapshot(
+            move_x=keys[K_d] - keys[K_a],
+            move_y=keys[K_s] - keys[K_w],
+            fire=bool(pygame.mouse.get_pressed()[0]),
+            aim=pygame.mouse.get_pos(),
+            item_slot=item_slot
+        )
+
+
+class ScriptedInputProvider(InputProvider):
+    """Input decided by code, for headless runs, tests and simulated players
+
+    Without a script the provider keeps returning the last snapshot it was
+    given with set_snapshot(), so callers can drive it by hand.
+
+    Args:
+        script (Callable, optional): Called with the tick number and the
+                                     state, returns that tick's snapshot
+
+    Attributes:
+        _snapshot (InputSnapshot): The snapshot returned without a script
+        _tick (int): Ticks polled so far
+    """
+    def __init__(self, script: Callable = None) -> None:
+        self._script = script
+        self._snapshot = IDLE_SNAPSHOT
+        self._tick = 0
+
+    def set_snapshot(self, snapshot: InputSnapshot) -> None:
+        """Set the input returned from now on
+
+        Args:
+            snapshot (InputSnapshot): The input to hold
+        """
+        self._snapshot = snapshot
+
+    def poll(self, state) -> InputSnapshot:
+        if self._script is not None:
+            self._snapshot = self._script(self._tick, state)
+
+        self._tick += 1
+        return self._snapshot
+
+
+class BotInputProvider(InputProvider):
+    """A simple player that wanders and shoots at the closest enemy
+
+    Args:
+        seed (int, optional): Seed for the bot's own random choices
+        wander_ticks (int): Ticks between changes of direction
+        heal_below (int): Hitpoints under which the first hotbar slot is used
+
+    Attributes:
+        _random (Random): The bot's random number generator, separate from the game's
+        _move (tuple): The direction the bot is wandering in
+        _ticks_left (int): Ticks until the bot picks a new direction
+    """
+    def __init__(self, seed: int = None, wander_ticks: int = 30, heal_below: int = 30) -> None:
+        self._random = random.Random(seed)
+        self._wander_ticks = wander_ticks
+        self._heal_below = heal_below
+        self._move = (0, 0)
+        self._ticks_left = 0
+
+    def poll(self, state) -> InputSnapshot:
+        if self._ticks_left <= 0:
+            self._move = (self._random.randint(-1, 1), self._random.randint(-1, 1))
+            self._ticks_left = self._wander_ticks
+        self._ticks_left -= 1
+
+        player = state.player
+        player_x, player_y = player.rect.center
+
+        # Aim at the closest enemy, if there is one
+        target = None
+        closest = None
+        for actor in state.actors:
+            enemy_x, enemy_y = actor.rect.center
+            distance = (enemy_x - player_x) ** 2 + (enemy_y - player_y) ** 2
+            if closest is None or distance < closest:
+                target, closest = actor, distance
+
+        item_slot = None
+        if player.attributes.current_hitpoints < self._heal_below and player.inventory.hotbar[0]:
+            item_slot = 0
+
+        return InputSnapshot(
+            move_x=self._move[0],
+            move_y=self._move[1],
+            fire=target is not None,
+            aim=target.rect.center if target is not None else (0, 0),
+            item_slot=item_slot
+        )
+
+
+class RecordedInputProvider(InputProvider):
+    """Plays back a stream of snapshots, one per tick, then idles
+
+    Args:
+        snapshots (Iterable[InputSnapshot]): The recorded input
+    """
+    def __init__(self, snapshots: Iterable[InputSnapshot]) -> None:
+        self._snapshots = iter(snapshots)
+        self._finished = False
+
+    def is_finished(self) -> bool:
+        """Return whether every recorded snapshot has been played"""
+        return self._finished
+
+    def poll(self, state) -> InputSnapshot:
+        snapshot = next(self._snapshots, None)
+
+        if snapshot is None:
+            self._finished = True
+            return IDLE_SNAPSHOT
+
+        return snapshot
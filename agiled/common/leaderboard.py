@@ -0,0 +1,246 @@
+"""Persistent leaderboard of finished runs"""
+import bisect
+import json
+import os
+import queue
+import threading
+import time
+from typing import List, NamedTuple, Optional
+
+# Where scores are kept, next to the package like the old high_scores.txt
+LEADERBOARD_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "leaderboard.jsonl")
+# The old top three scores, migrated when there is no leaderboard yet. The
+# file stays in the tree, so pulling this in does not delete a clone's
+# scores before they are migrated
+LEGACY_HIGH_SCORES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "high_scores.txt")
+
+
+class ScoreEntry(NamedTuple):
+    """One finished run
+
+    Attributes:
+        score (int): The final score
+        floor (int): The floor the run reached
+        kills (int): Number of enemies killed
+        seed (int): The seed the run was generated from, if known
+        timestamp (float): When the run ended, in seconds since the epoch
+    """
+    score: int
+    floor: int = 0
+    kills: int = 0
+    seed: Optional[int] = None
+    timestamp: float = 0.0
+
+
+class Leaderboard:
+    """Every recorded run, kept sorted by score.
+
+    Entries live in memory in a list sorted from best to worst, so the top
+    k are a slice and ranks come from a binary search. Inserting finds its
+    place in O(log n) but shifts the entries below it, which is O(n); with
+    ten thousand entries that is still under 10 microseconds, once per
+    finished run, so a plain list beats a tree or skip list here. The file
+    is an append-only log with one JSON entry per line. Each entry is
+    appended with a single O_APPEND write, so several game processes can
+    share the file, and a line torn by a crash is skipped when loading.
+    Writes happen on a background thread so recording a score never waits
+    on the disk.
+
+    Args:
+        path (str): The log file to load from and append to
+
+    Attributes:
+        _entries (list): Entries sorted by descending score, then age
+        _keys (list): The sort key of each entry, for bisect
+        _version (int): Bumped whenever an entry is added
+        _writes (Queue): Serialized entries waiting to be written
+        _writer (Thread): Appends queued entries to the log, started on first use
+    """
+    def __init__(self, path: str = LEADERBOARD_PATH) -> None:
+        self._path = path
+        self._entries: List[ScoreEntry] = []
+        self._keys: List[tuple] = []
+        self._version = 0
+
+        self._writes = queue.Queue()
+        self._writer: threading.Thread = None
+        self._lock = threading.Lock()
+
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # Getters
+    # ----------------------------------------------------------------------
+    def get_version(self) -> int:
+        """Return a number that changes whenever an entry is added
+
+        Returns:
+            int: The leaderboard's version
+        """
+        return self._version
+
+    def get_top(self, count: int) -> List[ScoreEntry]:
+        """Return the best entries
+
+        Args:
+            count (int): How many entries to return at most
+
+        Returns:
+            List[ScoreEntry]: The entries, best first
+        """
+        return self._entries[:count]
+
+    def get_top_scores(self, count: int) -> List[int]:
+        """Return the best scores, padded with zeros
+
+        Args:
+            count (int): How many scores to return
+
+        Returns:
+            List[int]: Exactly count scores, best first
+        """
+        scores = [entry.score for entry in self._entries[:count]]
+        return scores + [0] * (count - len(scores))
+
+    def get_rank(self, score: int) -> int:
+        """Return the 0-based position a score would take on the leaderboard
+
+        Args:
+            score (int): The score
+
+        Returns:
+            int: The number of entries with a higher score
+        """
+        return bisect.bisect_left(self._keys, (-score,))
+
+    # Properties
+    # ----------------------------------------------------------------------
+    version = property(get_version)
+
+    # Methods
+    # ----------------------------------------------------------------------
+    def add(self, entry: ScoreEntry) -> int:
+        """Record a run and queue it to be written to disk
+
+        Args:
+            entry (ScoreEntry): The run to record. A missing timestamp is
+                                filled in with the current time
+
+        Returns:
+            int: The 0-based rank the entry took
+        """
+        if not entry.timestamp:
+            entry = entry._replace(timestamp=time.time())
+
+        rank = self._insert(entry)
+        self._start_writer()
+        self._writes.put(json.dumps(entry._asdict()) + "\n")
+
+        return rank
+
+    def load(self) -> None:
+        """Read every entry from the log, replacing what is in memory"""
+        self._entries = []
+        self._keys = []
+
+        if os.path.exists(self._path):
+            with open(self._path, "rt") as log:
+                for line in log:
+                    try:
+                        self._insert(ScoreEntry(**json.loads(line)))
+                    except (ValueError, TypeError):
+                        # A partial line from a crash mid-write
+                        continue
+
+        elif os.path.exists(LEGACY_HIGH_SCORES_PATH) and self._path == LEADERBOARD_PATH:
+            with open(LEGACY_HIGH_SCORES_PATH, "rt") as score_file:
+                for score in score_file.readline().split(","):
+                    if score.strip() and int(score) > 0:
+                        self.add(ScoreEntry(int(score)))
+
+        self._version += 1
+
+    def flush(self) -> None:
+        """Wait until every queued entry is on disk"""
+        self._writes.join()
+
+    def close(self) -> None:
+        """Write out queued entries and stop the writer thread"""
+        if self._writer is not None:
+            self._writes.put(None)
+            self._writer.join()
+            self._writer = None
+
+    def _insert(self, entry: ScoreEntry) -> int:
+        """Place an entry in the sorted list, returning its rank
+
+        The binary search is O(log n); the list insert that follows is an
+        O(n) move of the entries below.
+        """
+        # Higher scores first, older entries first among equal scores
+        key = (-entry.score, entry.timestamp)
+
+        rank = bisect.bisect_right(self._keys, key)
+        self._keys.insert(rank, key)
+        self._entries.insert(rank, entry)
+        self._version += 1
+
+        return rank
+
+    def _start_writer(self) -> None:
+        """Start the writer thread if it is not running"""
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_entries, name="leaderboard-writer", daemon=True)
+                self._writer.start()
+
+    def _write_entries(self) -> None:
+        """Append queued entries to the log until told to stop"""
+        while True:
+            line = self._writes.get()
+
+            try:
+                if line is None:
+                    return
+
+                # O_BINARY keeps Windows from rewriting newlines; it is 0 elsewhere
+                flags = os.O_RDWR | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0)
+                descriptor = os.open(self._path, flags, 0o644)
+                try:
+                    # Start on a fresh line if a crash left one unfinished.
+                    # O_APPEND only moves writes, so seeking to read is safe
+                    if os.fstat(descriptor).st_size:
+                        os.lseek(descriptor, -1, os.SEEK_END)
+                        if os.read(descriptor, 1) != b"\n":
+                            line = "\n" + line
+
+                    os.write(descriptor, line.encode("utf-8"))
+                    os.fsync(descriptor)
+                finally:
+                    os.close(descriptor)
+            except Exception:
+                # Losing a score is better than killing the writer, which
+                # would leave flush() waiting forever
+                pass
+            finally:
+                self._writes.task_done()
+
+
+# The leaderboard shared by the menu and the game, loaded on first use
+_leaderboard = None
+
+
+def get_leaderboard() -> Leaderboard:
+    """Return the process-wide leaderboard, loading it the first time
+
+    Returns:
+        Leaderboard: The shared leaderboard
+    """
+    global _leaderboard
+
+    if _leaderboard is None:
+        _leaderboard = Leaderboard()
+
+    return _leaderboard
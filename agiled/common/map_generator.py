@@ -1,12 +1,8 @@
 """Map Generator class and helper functions"""
 import random
-import os
 
+from common.map_pack import MapTemplate, get_map_registry
 from common.room import Room
-from common.tileset import TileSet
-from common import util
-
-TN = TileSet.TileName
 
 
 class DungeonGenerator:
@@ -14,7 +10,7 @@ class DungeonGenerator:
     for the game.
 
     Attributes:
-        _tile_map (dict): The map of tiles for string conversion
+        _tile_matrixes (list): The MapTemplate of every room to pick from
         _room_count (int): The number of rooms spanning from root
         _room_queue (list): The queue of rooms waiting to be worked on
         _root (Room): The root room
@@ -22,15 +18,6 @@ class DungeonGenerator:
     def __init__(self):
         self._tile_matrixes = []
 
-        self._tile_map = {
-            "#": TN.WALL,
-            "_": TN.FLOOR,
-            "@": TN.WALL_TWO,
-            "M": TN.MUSHROOM,
-            "X": TN.SPIKES,
-            "L": TN.LOCK
-        }
-
         self.load_maps()
         self._room_count = 0
         self._room_queue = []
@@ -38,23 +25,28 @@ class DungeonGenerator:
         self._last_room = None
 
     def load_root(self):
-        with open(util.get_absolute_path_of_asset("other", "maps", "start.map"), "r") as file:
-            tile_matrix = self.str_to_tile_matrix(file.read())
-            self._root = Room(tile_matrix)
+        self._root = Room.from_template(self.load_template("start.map"))
 
     def generate_endroom(self):
-        with open(util.get_absolute_path_of_asset("other", "maps", "end.map"), "r") as file:
-            tile_matrix = self.str_to_tile_matrix(file.read())
+        return Room.from_template(self.load_template("end.map"))
+
+    def load_template(self, filename: str) -> MapTemplate:
+        """Returns a map file's template from the shared map registry
+
+        Args:
+            filename (str): Name of the file in the map directory
 
-        return Room(tile_matrix)
+        Returns:
+            MapTemplate: The map's template. It is shared and read-only
+        """
+        return get_map_registry()[filename]
 
     def load_maps(self):
-        """Loads in the pregenerated room maps from the map directory"""
-        for filename in os.listdir(util.get_absolute_path_of_asset_directory("other", "maps")):
+        """Loads in the pregenerated room maps from the map registry"""
+        # The registry is in name order, so a seed picks the same rooms everywhere
+        for filename, template in get_map_registry().items():
             if filename not in ["start.map", "end.map"]:
-                with open(util.get_absolute_path_of_asset("other", "maps", filename), "r") as file:
-                    tile_matrix = self.str_to_tile_matrix(file.read())
-                    self._tile_matrixes.append(tile_matrix)
+                self._tile_matrixes.append(template)
 
     def generate_map(self, seed, count):
         """Generates a random map given a seed and count
@@ -98,11 +90,8 @@ class DungeonGenerator:
         Returns:
             A randomly generated room
         """
-        tiles = random.choice(self._tile_matrixes)
-
-        room = [row[:] for row in tiles]
-
-        return Room(room)
+        # Room copies the shared grid once it is needed
+        return Room.from_template(random.choice(self._tile_matrixes))
 
     def populate_map(self):
         """Recursively populates a given root room with
@@ -145,29 +134,6 @@ class DungeonGenerator:
             self._room_queue.append(new_room)
             self._last_room = new_room
 
-    def str_to_tile_matrix(self, room_str: str) -> Room:
-        """Converts a string and dictionary of tiles into a room
-
-        Args:
-            room_str (str): The string representing the room
-
-        Returns:
-            A room made from the tiles
-        """
-        # Height/width of room
-        rows = room_str.strip().split("\n")
-
-        tile_matrix = []
-
-        for row in rows:
-            tile_matrix.append([])
-
-            for column in row:
-                if self._tile_map.get(column):
-                    tile_matrix[-1].append(self._tile_map[column])
-
-        return tile_matrix
-
     def get_tile_matrixes(self):
         return self._tile_matrixes
 
@@ -0,0 +1,292 @@
+"""Compiled, memory-mapped map templates
+
+Every .map file in the map directory is parsed once, offline, into a
+single binary pack holding each template's grid of tile ids along with
+its passable mask and the cells of its spawnpoints and portals. At
+startup the pack is memory-mapped and every template is a read-only view
+into it, so building a dungeon does no parsing or file access, and rooms
+answer for their masks and cells without scanning their grids.
+
+The pack remembers when each source map was last modified, and is
+compiled again when any of them changes or one is added or removed.
+
+Usage, from the agiled directory:
+    python -m common.map_pack
+"""
+import mmap
+import os
+import struct
+import tempfile
+import types
+import zlib
+from typing import List, Mapping, NamedTuple
+
+import numpy as np
+
+from common import util
+from common.tileset import TileSet, TILE_IDS, TILE_NAMES, get_shared_tile_set
+
+TN = TileSet.TileName
+
+# The tile each character of a .map file stands for; others are skipped
+MAP_CHARACTERS = {
+    "#": TN.WALL,
+    "_": TN.FLOOR,
+    "@": TN.WALL_TWO,
+    "M": TN.MUSHROOM,
+    "X": TN.SPIKES,
+    "L": TN.LOCK
+}
+
+MAP_DIRECTORY = util.get_absolute_path_of_asset_directory("other", "maps")
+MAP_PACK_PATH = os.path.join(os.path.dirname(MAP_DIRECTORY), "maps.pack")
+
+# Header: magic, format version, tile set signature, number of templates
+_HEADER = struct.Struct("<4sBII")
+_MAGIC = b"AGMP"
+_VERSION = 2
+
+# Per template: file name, source mtime, rows, columns, then the offset of
+# the grid, the passable mask, and the offset and count of each cell list
+_ENTRY = struct.Struct("<32sQHHIIIHIH")
+
+
+class MapTemplate(NamedTuple):
+    """A parsed map file. Its arrays are read-only and shared
+
+    Attributes:
+        name (str): The map's file name
+        grid (ndarray): The tile id of each cell, uint8
+        passable (ndarray): Which cells can be walked over
+        spawn_points (ndarray): The (row, column) of every enemy spawnpoint
+        portals (ndarray): The (row, column) of every portal tile
+    """
+    name: str
+    grid: np.ndarray
+    passable: np.ndarray
+    spawn_points: np.ndarray
+    portals: np.ndarray
+
+
+def parse_map(text: str) -> np.ndarray:
+    """Convert the text of a .map file into a grid of tile ids
+
+    Args:
+        text (str): The map, one row per line
+
+    Returns:
+        ndarray: The uint8 tile id of each cell
+    """
+    return np.array([
+        [TILE_IDS[MAP_CHARACTERS[character]] for character in row if character in MAP_CHARACTERS]
+        for row in text.strip().split("\n")
+    ], dtype=np.uint8)
+
+
+def get_tile_set_signature() -> int:
+    """Return a checksum of the tile ids and their flags, which a pack's grids
+    and cell lists depend on"""
+    names = "\n".join(name.name for name in TILE_NAMES).encode()
+    return zlib.crc32(get_shared_tile_set().flag_table.tobytes(), zlib.crc32(names))
+
+
+def get_map_sources(directory: str = MAP_DIRECTORY) -> List[tuple]:
+    """Return the (file name, mtime) of every map file, sorted by name
+
+    Sorted, so a seed picks the same rooms on every filesystem.
+    """
+    return [
+        (filename, os.stat(os.path.join(directory, filename)).st_mtime_ns)
+        for filename in sorted(os.listdir(directory)) if filename.endswith(".map")
+    ]
+
+
+def compile_map_pack(directory: str = MAP_DIRECTORY) -> bytes:
+    """Parse every map file in a directory into a pack
+
+    Args:
+        directory (str): The directory holding the .map files
+
+    Returns:
+        bytes: The compiled pack
+    """
+    flag_table = get_shared_tile_set().flag_table
+    sources = get_map_sources(directory)
+
+    entries = bytearray()
+    body = bytearray()
+    body_start = _HEADER.size + _ENTRY.size * len(sources)
+
+    def append(array: np.ndarray) -> int:
+        offset = body_start + len(body)
+        body.extend(array.tobytes())
+        return offset
+
+    for filename, mtime in sources:
+        if len(filename.encode()) > 32:
+            raise Exception("Map file name is too long to pack: " + filename)
+
+        with open(os.path.join(directory, filename), "r") as map_file:
+            grid = parse_map(map_file.read())
+
+        flags = flag_table[grid]
+        cells = [
+            np.argwhere(flags & flag).astype(np.uint16)
+            for flag in (TileSet.TileFlag.SPAWNPOINT, TileSet.TileFlag.PORTAL)
+        ]
+
+        offsets = [append(grid), append((flags & TileSet.TileFlag.PASSABLE) != 0)]
+        for cell_list in cells:
+            offsets += [append(cell_list), len(cell_list)]
+
+        entries += _ENTRY.pack(filename.encode(), mtime, grid.shape[0], grid.shape[1], *offsets)
+
+    header = _HEADER.pack(_MAGIC, _VERSION, get_tile_set_signature(), len(sources))
+    return bytes(header + entries + body)
+
+
+def read_map_pack_entries(buffer) -> tuple:
+    """Read a pack's header and entries, without touching the templates
+
+    Args:
+        buffer: The pack, as bytes or a memory map
+
+    Returns:
+        tuple: (signature, entries), where entries are the unpacked _ENTRY
+               of each template with its name decoded
+    """
+    magic, version, signature, count = _HEADER.unpack_from(buffer)
+    if magic != _MAGIC or version != _VERSION:
+        raise Exception("Not a map pack, or an unsupported version")
+
+    entries = []
+    for index in range(count):
+        name, *fields = _ENTRY.unpack_from(buffer, _HEADER.size + _ENTRY.size * index)
+        entries.append((name.rstrip(b"\0").decode(), *fields))
+
+    return signature, entries
+
+
+def read_map_pack(buffer) -> tuple:
+    """Read the templates out of a pack without copying them
+
+    Args:
+        buffer: The pack, as bytes or a memory map
+
+    Returns:
+        tuple: (signature, sources, templates), where sources is the
+               (file name, mtime) each template was compiled from
+    """
+    signature, entries = read_map_pack_entries(buffer)
+
+    sources = []
+    templates = {}
+
+    def cell_list(offset: int, cell_count: int) -> np.ndarray:
+        return np.frombuffer(buffer, np.uint16, cell_count * 2, offset).reshape(cell_count, 2)
+
+    for (name, mtime, rows, columns, grid_offset, passable_offset,
+         spawn_offset, spawn_count, portal_offset, portal_count) in entries:
+        sources.append((name, mtime))
+        templates[name] = MapTemplate(
+            name=name,
+            grid=np.frombuffer(buffer, np.uint8, rows * columns, grid_offset).reshape(rows, columns),
+            passable=np.frombuffer(buffer, np.bool_, rows * columns, passable_offset).reshape(rows, columns),
+            spawn_points=cell_list(spawn_offset, spawn_count),
+            portals=cell_list(portal_offset, portal_count)
+        )
+
+    return signature, sources, templates
+
+
+def write_map_pack(path: str = MAP_PACK_PATH, directory: str = MAP_DIRECTORY) -> bytes:
+    """Compile a pack and write it, replacing any old one in a single step
+
+    Args:
+        path (str): Where to write the pack
+        directory (str): The directory holding the .map files
+
+    Returns:
+        bytes: The compiled pack
+    """
+    pack = compile_map_pack(directory)
+
+    # Other processes may be reading the old pack, or writing their own
+    descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as pack_file:
+            pack_file.write(pack)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+    return pack
+
+
+def load_map_pack(path: str = MAP_PACK_PATH, directory: str = MAP_DIRECTORY) -> Mapping[str, MapTemplate]:
+    """Memory-map the pack, compiling it first if it is missing or stale
+
+    If the pack can't be written, the templates are compiled in memory.
+
+    Args:
+        path (str): Where the pack is kept
+        directory (str): The directory holding the .map files
+
+    Returns:
+        Mapping[str, MapTemplate]: The templates by file name, in name order
+    """
+    sources = get_map_sources(directory)
+    signature = get_tile_set_signature()
+
+    buffer = None
+    try:
+        with open(path, "rb") as pack_file:
+            buffer = mmap.mmap(pack_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # Check the entries first, so a stale pack has no views into it
+        pack_signature, entries = read_map_pack_entries(buffer)
+        if pack_signature == signature and [entry[:2] for entry in entries] == sources:
+            return types.MappingProxyType(read_map_pack(buffer)[2])
+    except Exception:
+        # Missing, empty or damaged packs are compiled again
+        pass
+
+    # Unmap the old pack before it is replaced, which Windows won't allow
+    # while it is still mapped
+    if buffer is not None:
+        buffer.close()
+
+    try:
+        buffer = write_map_pack(path, directory)
+    except OSError:
+        buffer = compile_map_pack(directory)
+
+    return types.MappingProxyType(read_map_pack(buffer)[2])
+
+
+# The templates shared by the whole process, loaded on first use
+_registry = None
+
+
+def get_map_registry() -> Mapping[str, MapTemplate]:
+    """Returns the process-wide, read-only templates by file name"""
+    global _registry
+
+    if _registry is None:
+        _registry = load_map_pack()
+
+    return _registry
+
+
+def main() -> None:
+    """Compile the map pack from the command line"""
+    pack = write_map_pack()
+    templates = read_map_pack(pack)[2]
+
+    print("{} maps packed into {} ({} bytes)".format(len(templates), MAP_PACK_PATH, len(pack)))
+
+
+if __name__ == "__main__":
+    main()
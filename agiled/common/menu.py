@@ -1,7 +1,6 @@
 """Implements the Menu that appears at the start of the game and while paused."""
-import os
 import pygame
-from common import util
+from common import assets, leaderboard, util
 
 class Menu():
 
@@ -16,79 +15,89 @@ class Menu():
 
         # Fetch images from the dir
         img_path = util.get_absolute_path_of_asset("images", "screens", "main.png")
-        self._image = pygame.image.load(img_path)
+        self._image = assets.load_image(img_path)
 
         paused_img_path = util.get_absolute_path_of_asset("images", "screens", "paused.png")
-        self._paused_image = pygame.image.load(paused_img_path)
+        self._paused_image = assets.load_image(paused_img_path)
 
         game_over_img_path = util.get_absolute_path_of_asset("images", "screens", "gameover.png")
-        self._game_over_image = pygame.image.load(game_over_img_path)
-
-        #self._score = pygame.
-
-    def draw_main_menu(self):
-        # Display image loaded in init
-        scene = pygame.display.set_mode(self._screen_dimensions)
-        scene.blit(self._image, (0, 0))
-
-        x_pos = 525
-        y_pos = 500
-        score_list = self.read_high_scores()
-        self._font_text.render_to(scene, (x_pos, y_pos - 1), "High Scores: ", size=24)
-                
-        self._font_text.render_to(scene, (x_pos + 130, y_pos), str(score_list[0]), size=24)
-        self._font_text.render_to(scene, (x_pos + 130, y_pos + 30), str(score_list[1]), size=24)
-        self._font_text.render_to(scene, (x_pos + 130, y_pos + 60), str(score_list[2]), size=24)
-
-        self._font_text.render_to(scene, (300, 660), "wasd to move - click to shoot arrows - number keys to use items", size=24)
-        self._font_text.render_to(scene, (500, 690), "Press any key to continue ", size=24)
-
-    def draw_pause_menu(self):
-        scene = pygame.display.set_mode(self._screen_dimensions)
-        scene.blit(self._image, (0, 0))
-        pygame.display.set_mode(self._screen_dimensions).blit(self._paused_image, (0, 0))
-
-        self._font_text.render_to(scene, (500, 500), "Paused", size=30)
-        self._font_text.render_to(scene, (500, 600), "Press 'p' to resume game", size=24)
-
-    def draw_game_over(self):
-        scene = pygame.display.set_mode(self._screen_dimensions)
-        scene.blit(self._image, (0, 0))
-        pygame.display.set_mode(self._screen_dimensions).blit(self._game_over_image, (0, 0))
-
-    def read_high_scores(self):
-        temp_d = os.path.dirname(os.path.abspath(__file__))
-        filename = os.path.join(temp_d, 'high_scores.txt')
-
-        score_file = open(filename,"rt+")
-        scores = score_file.readline()
-        score_list = scores.split(",")
-        score_int_list = list(map(int, score_list))
-        score_file.close()
-        return score_int_list
-
-    def update_high_scores(self, new_score):
-        score_changed = False
-        temp_d = os.path.dirname(os.path.abspath(__file__))
-        filename = os.path.join(temp_d, 'high_scores.txt')
-
-        score_file = open(filename,"rt+")
-        scores = score_file.readline()
-        score_list = scores.split(",")
-        score_int_list = list(map(int, score_list))
-        temp = 0
-        for i in range(len(score_int_list)):
-            if new_score >= score_int_list[i]:
-                score_changed = True
-                temp = score_int_list[i]
-                score_int_list[i] = new_score
-                score_str_list = list(map(str, score_int_list))
-                glue = ","
-                score_write_out = glue.join(score_str_list)
-                new_score = temp
-
-        if score_changed:
-            score_file.seek(0)
-            score_file.write(score_write_out)
-            score_file.truncate()
-            score_file.close()
+        self._game_over_image = assets.load_image(game_over_img_path)
+
+        # Composed screens, keyed on name, and the leaderboard version shown on them
+        self._screens = {}
+        self._scores_version = None
+
+    def get_main_menu(self) -> pygame.Surface:
+        """Return the main menu screen, composing it again when the scores change"""
+        # Compose again whenever a score has been added since
+        version = leaderboard.get_leaderboard().version
+        if "main" not in self._screens or self._scores_version != version:
+            self._scores_version = version
+            screen = self._new_screen()
+            screen.blit(self._image, (0, 0))
+
+            x_pos = 525
+            y_pos = 500
+            score_list = self.get_high_scores()
+            self._font_text.render_to(screen, (x_pos, y_pos - 1), "High Scores: ", size=24)
+
+            self._font_text.render_to(screen, (x_pos + 130, y_pos), str(score_list[0]), size=24)
+            self._font_text.render_to(screen, (x_pos + 130, y_pos + 30), str(score_list[1]), size=24)
+            self._font_text.render_to(screen, (x_pos + 130, y_pos + 60), str(score_list[2]), size=24)
+
+            self._font_text.render_to(screen, (300, 660), "wasd to move - click to shoot arrows - number keys to use items", size=24)
+            self._font_text.render_to(screen, (500, 690), "Press any key to continue ", size=24)
+
+            self._screens["main"] = screen
+
+        return self._screens["main"]
+
+    def get_pause_menu(self) -> pygame.Surface:
+        """Return the pause screen, composing it the first time"""
+        if "paused" not in self._screens:
+            screen = self._new_screen()
+            screen.blit(self._image, (0, 0))
+            screen.blit(self._paused_image, (0, 0))
+
+            self._font_text.render_to(screen, (500, 500), "Paused", size=30)
+            self._font_text.render_to(screen, (500, 600), "Press 'p' to resume game", size=24)
+
+            self._screens["paused"] = screen
+
+        return self._screens["paused"]
+
+    def get_game_over(self) -> pygame.Surface:
+        """Return the game over screen, composing it the first time"""
+        if "game_over" not in self._screens:
+            screen = self._new_screen()
+            screen.blit(self._image, (0, 0))
+            screen.blit(self._game_over_image, (0, 0))
+
+            self._screens["game_over"] = screen
+
+        return self._screens["game_over"]
+
+    def draw_main_menu(self, window=None):
+        """Blit the main menu onto a surface, the display by default"""
+        (window or pygame.display.get_surface()).blit(self.get_main_menu(), (0, 0))
+
+    def draw_pause_menu(self, window=None):
+        """Blit the pause screen onto a surface, the display by default"""
+        (window or pygame.display.get_surface()).blit(self.get_pause_menu(), (0, 0))
+
+    def draw_game_over(self, window=None):
+        """Blit the game over screen onto a surface, the display by default"""
+        (window or pygame.display.get_surface()).blit(self.get_game_over(), (0, 0))
+
+    def get_high_scores(self):
+        """Return the top three scores from the leaderboard"""
+        return leaderboard.get_leaderboard().get_top_scores(3)
+
+    def _new_screen(self) -> pygame.Surface:
+        """Return a blank surface the size of the window"""
+        screen = pygame.Surface(self._screen_dimensions)
+
+        if pygame.display.get_surface() is not None:
+            screen = screen.convert()
+
+        return screen
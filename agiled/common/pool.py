@@ -0,0 +1,73 @@
+"""Object pool for recycling entities instead of rebuilding them"""
+from typing import Callable
+
+
+class EntityPool:
+    """Hands out recycled entities, resetting them in place.
+
+    New instances are only built while the pool is empty, so the pool grows
+    to the highest number of entities alive at once and then stops
+    allocating. Pooled classes implement reset(), which takes the same
+    arguments as acquire().
+
+    Args:
+        factory (Callable): Builds a new, blank entity when the pool is empty
+
+    Attributes:
+        _free (list): Released entities waiting to be reused
+        _allocated (int): Number of entities the pool has ever built
+    """
+    def __init__(self, factory: Callable) -> None:
+        self._factory = factory
+        self._free = []
+        self._allocated = 0
+
+    def __len__(self) -> int:
+        return len(self._free)
+
+    # Getters
+    # ----------------------------------------------------------------------
+    def get_allocated(self) -> int:
+        """Return the number of entities the pool has built (its high-water mark)
+
+        Returns:
+            int: Number of entities built
+        """
+        return self._allocated
+
+    # Properties
+    # ----------------------------------------------------------------------
+    allocated = property(get_allocated)
+
+    # Methods
+    # ----------------------------------------------------------------------
+    def acquire(self, *args, **kwargs):
+        """Return a reset entity, reusing a released one if possible
+
+        Returns:
+            Entity: An entity reset with the given arguments
+        """
+        if self._free:
+            entity = self._free.pop()
+        else:
+            entity = self._factory()
+            self._allocated += 1
+
+        entity.reset(*args, **kwargs)
+        return entity
+
+    def release(self, entity) -> None:
+        """Give an entity back to the pool once nothing uses it
+
+        Args:
+            entity (Entity): The entity to recycle
+        """
+        self._free.append(entity)
+
+    def release_all(self, entities) -> None:
+        """Give several entities back to the pool
+
+        Args:
+            entities (Iterable[Entity]): The entities to recycle
+        """
+        self._free.extend(entities)
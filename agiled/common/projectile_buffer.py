@@ -0,0 +1,170 @@
+"""Structure-of-arrays storage for every live projectile in a room"""
+from typing import List
+
+import numpy as np
+import pygame
+
+# Who fired a projectile, which decides what it can hit
+OWNER_PLAYER = 0
+OWNER_ENEMY = 1
+
+# Distance a projectile travels before it drops, 10 tiles
+PROJECTILE_RANGE = 10 * 32
+
+
+class ProjectileBuffer:
+    """Holds live projectiles as parallel NumPy columns so they can be
+    advanced, range-checked and compacted in a few vectorized operations
+    per tick instead of one Python object at a time.
+
+    Args:
+        capacity (int): Number of projectiles to allocate room for up front.
+                        The buffer doubles in size whenever it fills up.
+
+    Attributes:
+        _count (int): Number of live projectiles
+        _x, _y (ndarray): Top-left position of each projectile
+        _x_speed, _y_speed (ndarray): Velocity of each projectile
+        _step (ndarray): Distance each projectile covers per tick
+        _range (ndarray): Distance each projectile can still travel
+        _damage (ndarray): Damage each projectile does
+        _owner (ndarray): OWNER_PLAYER or OWNER_ENEMY for each projectile
+        _width, _height (ndarray): Size of each projectile's rect
+        _images (list): Surface drawn for each projectile
+    """
+    _COLUMNS = (
+        ("_x", np.float64), ("_y", np.float64),
+        ("_x_speed", np.float64), ("_y_speed", np.float64),
+        ("_step", np.float64), ("_range", np.float64),
+        ("_damage", np.int32), ("_owner", np.uint8),
+        ("_width", np.int32), ("_height", np.int32)
+    )
+
+    def __init__(self, capacity: int = 64) -> None:
+        self._count = 0
+        self._capacity = max(1, capacity)
+        self._images: List[pygame.Surface] = []
+
+        for name, dtype in self._COLUMNS:
+            setattr(self, name, np.zeros(self._capacity, dtype=dtype))
+
+    def __len__(self) -> int:
+        return self._count
+
+    # Getters
+    # ----------------------------------------------------------------------
+    def get_centers(self) -> tuple:
+        """Returns the centre of every live projectile
+
+        Returns:
+            tuple: (x, y) arrays of projectile centres
+        """
+        count = self._count
+        return (
+            self._x[:count] + self._width[:count] / 2,
+            self._y[:count] + self._height[:count] / 2
+        )
+
+    def get_sizes(self) -> tuple:
+        """Returns the rect size of every live projectile
+
+        Returns:
+            tuple: (width, height) arrays
+        """
+        return (self._width[:self._count], self._height[:self._count])
+
+    def get_damage(self) -> np.ndarray:
+        """Returns the damage of every live projectile"""
+        return self._damage[:self._count]
+
+    def get_owners(self) -> np.ndarray:
+        """Returns the owner of every live projectile"""
+        return self._owner[:self._count]
+
+    def get_out_of_range(self) -> np.ndarray:
+        """Returns a mask of the projectiles that have used up their range"""
+        return self._range[:self._count] <= 0
+
+    def get_blit_sequence(self) -> list:
+        """Returns (image, position) pairs for Surface.blits
+
+        Returns:
+            list: One (Surface, (x, y)) pair per live projectile
+        """
+        count = self._count
+        return list(zip(self._images, zip(self._x[:count].tolist(), self._y[:count].tolist())))
+
+    # Methods
+    # ----------------------------------------------------------------------
+    def add(self, position: tuple, speed: tuple, damage: int, image: pygame.Surface,
+            owner: int = OWNER_PLAYER) -> None:
+        """Add a newly fired projectile to the buffer
+
+        Args:
+            position (tuple): x/y position of the projectile's top-left
+            speed (tuple): The projectile's velocity
+            damage (int): The damage the projectile will do
+            image (pygame.Surface): The projectile's image, which also sizes its rect
+            owner (int): OWNER_PLAYER or OWNER_ENEMY
+        """
+        if self._count == self._capacity:
+            self._grow()
+
+        index = self._count
+        x_speed, y_speed = speed
+
+        self._x[index], self._y[index] = position
+        self._x_speed[index] = x_speed
+        self._y_speed[index] = y_speed
+        self._step[index] = np.hypot(x_speed, y_speed)
+        self._range[index] = PROJECTILE_RANGE
+        self._damage[index] = damage
+        self._owner[index] = owner
+        self._width[index], self._height[index] = image.get_size()
+        self._images.append(image)
+
+        self._count += 1
+
+    def advance(self) -> None:
+        """Move every projectile by its velocity and use up its range"""
+        count = self._count
+
+        self._x[:count] += self._x_speed[:count]
+        self._y[:count] += self._y_speed[:count]
+
+        remaining = self._range[:count]
+        remaining -= self._step[:count]
+        np.maximum(remaining, 0, out=remaining)
+
+    def compact(self, keep: np.ndarray) -> None:
+        """Drop the projectiles not selected by a mask, keeping their order
+
+        Args:
+            keep (ndarray): Boolean mask over the live projectiles
+        """
+        indices = np.flatnonzero(keep)
+        count = len(indices)
+
+        if count == self._count:
+            return
+
+        for name, _ in self._COLUMNS:
+            column = getattr(self, name)
+            column[:count] = column[:self._count][indices]
+
+        self._images = [self._images[index] for index in indices.tolist()]
+        self._count = count
+
+    def clear(self) -> None:
+        """Remove every projectile"""
+        self._count = 0
+        self._images = []
+
+    def _grow(self) -> None:
+        """Double the capacity of every column"""
+        self._capacity *= 2
+
+        for name, dtype in self._COLUMNS:
+            column = np.zeros(self._capacity, dtype=dtype)
+            column[:self._count] = getattr(self, name)[:self._count]
+            setattr(self, name, column)
@@ -0,0 +1,271 @@
+"""Compact recording and playback of runs
+
+A replay is the run's seed plus the input snapshot of every tick that was
+simulated. Because the seed fixes every random choice, feeding the same
+snapshots back into a State seeded the same way plays the run out again.
+
+Usage, from the agiled directory:
+    python -m common.replay run.agr [--realtime]
+"""
+import argparse
+import struct
+import time
+import zlib
+from typing import List
+
+from common.headless import HeadlessRunner
+from common.input import InputProvider, InputSnapshot, IDLE_SNAPSHOT, RecordedInputProvider
+
+# Header: magic, format version, seed, number of ticks
+_HEADER = struct.Struct("<4sBQI")
+_MAGIC = b"AGRP"
+_VERSION = 6
+
+# Per tick, a byte of flags says which fields changed since the last tick
+_MOVE_CHANGED = 1
+_FIRE_CHANGED = 2
+_AIM_CHANGED_SMALL = 4
+_AIM_CHANGED = 8
+_ITEM_CHANGED = 16
+
+_NO_ITEM = 255
+
+
+class Replay:
+    """A recorded run
+
+    Args:
+        seed (int): The seed the run's State was built with
+        snapshots (List[InputSnapshot]): The input of each simulated tick
+    """
+    def __init__(self, seed: int, snapshots: List[InputSnapshot] = None) -> None:
+        self._seed = seed
+        self._snapshots = snapshots if snapshots is not None else []
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    # Getters
+    # ----------------------------------------------------------------------
+    def get_seed(self) -> int:
+        """Return the seed the run was started from"""
+        return self._seed
+
+    def get_snapshots(self) -> List[InputSnapshot]:
+        """Return the input of each simulated tick"""
+        return self._snapshots
+
+    # Properties
+    # ----------------------------------------------------------------------
+    seed = property(get_seed)
+    snapshots = property(get_snapshots)
+
+    # Methods
+    # ----------------------------------------------------------------------
+    def to_bytes(self) -> bytes:
+        """Encode the replay
+
+        Each tick is stored as the fields that changed since the tick before,
+        and the whole stream is zlib compressed, so long stretches of the
+        same input cost next to nothing.
+
+        Returns:
+            bytes: The encoded replay
+        """
+        body = bytearray()
+        previous = IDLE_SNAPSHOT
+
+        for snapshot in self._snapshots:
+            flags = 0
+            payload = bytearray()
+
+            if snapshot.move_x != previous.move_x or snapshot.move_y != previous.move_y:
+                flags |= _MOVE_CHANGED
+                payload.append((snapshot.move_x + 1) * 3 + snapshot.move_y + 1)
+
+            if snapshot.fire != previous.fire:
+                flags |= _FIRE_CHANGED
+
+            if snapshot.aim != previous.aim:
+                delta_x = snapshot.aim[0] - previous.aim[0]
+                delta_y = snapshot.aim[1] - previous.aim[1]
+
+                if -128 <= delta_x < 128 and -128 <= delta_y < 128:
+                    flags |= _AIM_CHANGED_SMALL
+                    payload += struct.pack("<bb", delta_x, delta_y)
+                else:
+                    flags |= _AIM_CHANGED
+                    payload += struct.pack("<hh", snapshot.aim[0], snapshot.aim[1])
+
+            if snapshot.item_slot != previous.item_slot:
+                flags |= _ITEM_CHANGED
+                payload.append(_NO_ITEM if snapshot.item_slot is None else snapshot.item_slot)
+
+            body.append(flags)
+            body += payload
+            previous = snapshot
+
+        header = _HEADER.pack(_MAGIC, _VERSION, self._seed, len(self._snapshots))
+        return header + zlib.compress(bytes(body), 9)
+
+    @staticmethod
+    def from_bytes(data: bytes) -> 'Replay':
+        """Decode a replay made by to_bytes()
+
+        Args:
+            data (bytes): The encoded replay
+
+        Returns:
+            Replay: The decoded replay
+        """
+        magic, version, seed, ticks = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION:
+            raise Exception("Not a replay, or an unsupported version")
+
+        body = zlib.decompress(data[_HEADER.size:])
+        snapshots = []
+        previous = IDLE_SNAPSHOT
+        offset = 0
+
+        for _ in range(ticks):
+            flags = body[offset]
+            offset += 1
+
+            move_x, move_y, fire, aim, item_slot = previous
+
+            if flags & _MOVE_CHANGED:
+                move_x, move_y = divmod(body[offset], 3)
+                move_x, move_y = move_x - 1, move_y - 1
+                offset += 1
+
+            if flags & _FIRE_CHANGED:
+                fire = not fire
+
+            if flags & _AIM_CHANGED_SMALL:
+                delta_x, delta_y = struct.unpack_from("<bb", body, offset)
+                aim = (aim[0] + delta_x, aim[1] + delta_y)
+                offset += 2
+            elif flags & _AIM_CHANGED:
+                aim = struct.unpack_from("<hh", body, offset)
+                offset += 4
+
+            if flags & _ITEM_CHANGED:
+                item_slot = None if body[offset] == _NO_ITEM else body[offset]
+                offset += 1
+
+            previous = InputSnapshot(move_x, move_y, fire, aim, item_slot)
+            snapshots.append(previous)
+
+        return Replay(seed, snapshots)
+
+    def save(self, path: str) -> None:
+        """Write the encoded replay to a file"""
+        with open(path, "wb") as replay_file:
+            replay_file.write(self.to_bytes())
+
+    @staticmethod
+    def load(path: str) -> 'Replay':
+        """Read a replay from a file"""
+        with open(path, "rb") as replay_file:
+            return Replay.from_bytes(replay_file.read())
+
+
+class ReplayRecorder(InputProvider):
+    """Wraps another input provider and records what it returns
+
+    Only ticks that are simulated are recorded; while the game is paused
+    or on the menus State.update() does nothing, so there is nothing to
+    replay. The seed is taken when the recorder is attached to its State,
+    so a session that ends before its first tick still saves.
+
+    Args:
+        provider (InputProvider): The provider to record
+    """
+    def __init__(self, provider: InputProvider) -> None:
+        self._provider = provider
+        self._seed = None
+        self._snapshots = []
+
+    def get_replay(self) -> Replay:
+        """Return everything recorded so far"""
+        if self._seed is None:
+            raise Exception("The recorder was never attached to a State")
+        return Replay(self._seed, list(self._snapshots))
+
+    def attach(self, state) -> None:
+        self._seed = state.get_seed()
+        self._provider.attach(state)
+
+    def poll(self, state) -> InputSnapshot:
+        snapshot = self._provider.poll(state)
+
+        if not state.paused:
+            self._snapshots.append(snapshot)
+
+        return snapshot
+
+
+class ReplayPlayer:
+    """Plays a replay back through a headless State
+
+    Args:
+        replay (Replay): The replay to play
+
+    Attributes:
+        runner (HeadlessRunner): Steps the replayed State
+        tick_times (list): Wall-clock seconds each replayed tick took
+    """
+    def __init__(self, replay: Replay) -> None:
+        self._replay = replay
+        self._runner = HeadlessRunner(RecordedInputProvider(replay.snapshots), seed=replay.seed)
+        self._tick_times = []
+
+    def get_runner(self) -> HeadlessRunner:
+        """Return the runner stepping the replayed State"""
+        return self._runner
+
+    def get_tick_times(self) -> List[float]:
+        """Return how long each replayed tick took, in seconds"""
+        return self._tick_times
+
+    runner = property(get_runner)
+    tick_times = property(get_tick_times)
+
+    def play(self, realtime: bool = False, tick_rate: int = 60) -> None:
+        """Feed every recorded tick into the State
+
+        Args:
+            realtime (bool): Pace the ticks at tick_rate instead of running
+                             them as fast as possible
+            tick_rate (int): Ticks per second when playing in real time
+        """
+        start = time.perf_counter()
+
+        for tick in range(len(self._replay)):
+            if realtime:
+                delay = start + tick / tick_rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+            tick_start = time.perf_counter()
+            self._runner.run(1)
+            self._tick_times.append(time.perf_counter() - tick_start)
+
+
+def main() -> None:
+    """Play a replay file from the command line and print how it ran"""
+    parser = argparse.ArgumentParser(description="Play back an Agile Dungeon replay")
+    parser.add_argument("path", help="The replay file")
+    parser.add_argument("--realtime", action="store_true", help="Play at game speed instead of flat out")
+    args = parser.parse_args()
+
+    player = ReplayPlayer(Replay.load(args.path))
+    player.play(args.realtime)
+
+    slowest = max(player.tick_times, default=0.0)
+    print(player.runner.get_report())
+    print("slowest tick {:.2f}ms".format(slowest * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,15 @@
 """Class that represents a single room"""
+import time
 from typing import List
-from common.tileset import TileSet
+import numpy as np
 import pygame
+from common.collision import TILE_SIZE
+from common.tileset import Tile, TileSet, TILE_IDS, get_shared_tile_set
+from common.collision import TileCollisionMap
+from common.map_pack import MapTemplate
+
+# The flags a room reads from its template instead of its grid
+_TEMPLATE_FLAGS = TileSet.TileFlag.PASSABLE | TileSet.TileFlag.SPAWNPOINT | TileSet.TileFlag.PORTAL
 
 
 class SpawnLocations():
@@ -17,29 +25,61 @@ class Room:
     """Class representing a room that the player can move in, interact with,
     and collide with
 
-    Attributes:
-        matrix: A 2d matrix representing a room
+    A room made with from_template() only keeps a reference to the shared
+    map template, and the doors added to it, until its tiles are first
+    needed. Then it is materialized into a grid and collision map of its
+    own. So a whole floor can be laid out without copying any tiles. Its
+    passable mask, spawnpoints and portals come from the template for as
+    long as no tile changes them.
 
+    Args:
+        matrix: A 2d matrix of TileName's, or a 2d array of tile ids, representing the room
+
+    Attributes:
         _north_room: Room object representing the room's neighbor to the north
         _south_room: Room object representing the room's neighbor to the south
         _east_room: Room object representing the room's neighbor to the east
         _west_room: Room object representing the room's neighbor to the west
 
-        _matrix: A matrix of TileName's to make sprite map generation more efficient
-        _sprite_matrix: A matrix of Tile sprites for drawing and collision logic
+        _template: The shared MapTemplate the room is made from, None once a tile changes it
+        _doors: The directions of doors added before the room was materialized
+        _grid: A uint8 array holding the tile id of each cell, None until materialized
+        _background: The room's tiles pre-rendered onto one surface, built lazily
+        _background_rows: How many rows of tiles have been drawn onto _background
+        _collision_map: A grid-indexed lookup of the room's tiles for collision logic
         _initialized: A boolean representing if the room has been initialized or not
     """
 
-    def __init__(self, matrix):
+    def __init__(self, matrix=None):
         self._north_room: 'Room' = None
         self._south_room: 'Room' = None
         self._east_room: 'Room' = None
         self._west_room: 'Room' = None
 
-        self._matrix: TileSet.TileName = matrix
-        self._sprite_matrix: List[pygame.sprite.Group] = None
+        self._template: MapTemplate = None
+        self._doors: List[str] = []
+        self._grid: np.ndarray = None
+        self._background: pygame.Surface = None
+        self._background_rows: int = 0
+        self._collision_map: TileCollisionMap = None
         self._initialized: bool = False
-        self.update_sprite_matrix()
+
+        if matrix is not None:
+            self.update_grid(matrix)
+
+    @classmethod
+    def from_template(cls, template: MapTemplate) -> 'Room':
+        """Make a room from a shared map template, copied only once it is needed
+
+        Args:
+            template (MapTemplate): The template, from the map registry
+
+        Returns:
+            Room: The new room
+        """
+        room = cls()
+        room.use_template(template)
+        return room
 
     # Getters
     # ----------------------------------------------------------------------
@@ -47,9 +87,95 @@ class Room:
         """Return the initialization state of the room"""
         return self._initialized
 
-    def get_sprite_matrix(self) -> List[pygame.sprite.Group]:
-        """Returns the room's sprite matrix"""
-        return self._sprite_matrix
+    def is_materialized(self) -> bool:
+        """Return whether the room has a grid of its own yet"""
+        return self._grid is not None
+
+    def get_grid(self) -> np.ndarray:
+        """Returns the room's grid of tile ids"""
+        if self._grid is None:
+            self.materialize()
+        return self._grid
+
+    def get_tile(self, row: int, column: int) -> Tile:
+        """Returns the shared tile at a cell
+
+        Args:
+            row (int): The row of the cell
+            column (int): The column of the cell
+
+        Returns:
+            Tile: The tile at that cell
+        """
+        return get_shared_tile_set().get_tile_by_id(self.get_grid().item(row, column))
+
+    def get_tile_matrix(self) -> List[List[Tile]]:
+        """Returns the room's rows of shared tiles, built from the grid"""
+        tiles = get_shared_tile_set().tiles_by_id
+        return [[tiles[tile_id] for tile_id in row] for row in self.get_grid().tolist()]
+
+    def get_background(self) -> pygame.Surface:
+        """Returns the room's tiles pre-rendered onto a single surface
+
+        The surface is built the first time it is asked for, unless
+        render_background() got there first, and reused until a tile changes.
+
+        Returns:
+            pygame.Surface: The room's static background layer
+        """
+        self.render_background()
+        return self._background
+
+    def get_flags(self) -> np.ndarray:
+        """Returns the TileSet.TileFlag bits of every cell
+
+        Returns:
+            ndarray: A uint8 array the same shape as the grid
+        """
+        return get_shared_tile_set().flag_table[self.get_grid()]
+
+    def get_mask(self, flag: 'TileSet.TileFlag') -> np.ndarray:
+        """Returns which cells have a tile flag set
+
+        Args:
+            flag (TileSet.TileFlag): The flag to check
+
+        Returns:
+            ndarray: A boolean array the same shape as the grid
+        """
+        return (self.get_flags() & flag) != 0
+
+    def get_passable_mask(self) -> np.ndarray:
+        """Returns which cells can be walked over"""
+        if self._template is not None:
+            return self._template.passable
+        return self.get_mask(TileSet.TileFlag.PASSABLE)
+
+    def get_hazard_mask(self) -> np.ndarray:
+        """Returns which cells damage the player"""
+        return self.get_mask(TileSet.TileFlag.DAMAGING)
+
+    def get_spawn_points(self) -> np.ndarray:
+        """Returns the (row, column) of every enemy spawnpoint, in row-major order"""
+        if self._template is not None:
+            return self._template.spawn_points
+        return np.argwhere(self.get_mask(TileSet.TileFlag.SPAWNPOINT))
+
+    def get_door_positions(self) -> np.ndarray:
+        """Returns the (row, column) of every door tile, in row-major order"""
+        return np.argwhere(self.get_mask(TileSet.TileFlag.DOOR))
+
+    def get_portal_positions(self) -> np.ndarray:
+        """Returns the (row, column) of every portal tile, in row-major order"""
+        if self._template is not None:
+            return self._template.portals
+        return np.argwhere(self.get_mask(TileSet.TileFlag.PORTAL))
+
+    def get_collision_map(self) -> TileCollisionMap:
+        """Returns the room's collision map"""
+        if self._grid is None:
+            self.materialize()
+        return self._collision_map
 
     def get_room_at_direction(self, direction: str) -> 'Room':
         """Returns the room at a direction
@@ -139,6 +265,11 @@ class Room:
         Args:
             direction (str): The direction to add
         """
+        # Rooms still sharing their template get their doors when materialized
+        if self._grid is None:
+            self._doors.append(direction)
+            return
+
         if direction == "north":
             self.set_tile(0, 19, TileSet.TileName.NORTH)
             self.set_tile(0, 20, TileSet.TileName.NORTH)
@@ -155,37 +286,113 @@ class Room:
             self.set_tile(11, 0, TileSet.TileName.WEST)
             self.set_tile(12, 0, TileSet.TileName.WEST)
 
-        self.update_sprite_matrix()
-
     def set_tile(self, column: int, row: int, tilename: str):
         """Sets the tile at position (x,y) to the TileName
 
+        Only the changed cell is patched.
+
         Args:
             column (int): The desired column position
             row (int): The desired row position
             tilename (TileName): The desired tile to be set
         """
-        self._matrix[column][row] = tilename
+        grid = self.get_grid()
+        tile_id = TILE_IDS[tilename]
+
+        # Doors only replace walls, so the template still describes the room
+        if self._template is not None:
+            flag_table = get_shared_tile_set().flag_table
+            if (flag_table[grid[column, row]] ^ flag_table[tile_id]) & _TEMPLATE_FLAGS:
+                self._template = None
+
+        # The collision map shares the grid, so it sees the change too
+        grid[column, row] = tile_id
+        self._background = None
+
+    def update_grid(self, matrix):
+        """Stores a room layout as a grid of tile ids
+
+        Args:
+            matrix: A 2d matrix of TileName's, or a 2d array of tile ids
+        """
+        self._template = None
+        self._doors = []
+        self._background = None
+
+        if isinstance(matrix, np.ndarray):
+            self._grid = np.array(matrix, dtype=np.uint8)
+        else:
+            self._grid = np.array(
+                [[TILE_IDS[tilename] for tilename in row] for row in matrix],
+                dtype=np.uint8
+            )
+
+        self._collision_map = TileCollisionMap(self._grid, get_shared_tile_set().tiles_by_id)
+
+    def use_template(self, template: MapTemplate):
+        """Lays the room out from a shared map template, without copying it
+
+        Args:
+            template (MapTemplate): The template, from the map registry
+        """
+        self._template = template
+        self._doors = []
+        self._grid = None
+        self._background = None
+        self._collision_map = None
+
+    def materialize(self) -> None:
+        """Gives a room made from a shared template its own grid, with its doors
+        cut in, and collision map"""
+        if self._grid is not None:
+            return
+
+        self._grid = np.array(self._template.grid, dtype=np.uint8)
+        self._collision_map = TileCollisionMap(self._grid, get_shared_tile_set().tiles_by_id)
 
-    def update_sprite_matrix(self):
-        """Converts a tile-name matrix to a sprite matrix"
+        doors, self._doors = self._doors, []
+        for direction in doors:
+            self.add_door(direction)
+
+    def render_background(self, deadline: float = None) -> bool:
+        """Draws the room's tiles onto its background layer, a row at a time
+
+        Rendering can be spread over several calls by passing a deadline, so
+        rooms can be prepared in whatever time a frame has to spare.
 
         Args:
-            self._matrix (list[TileName]): Matrix of tile names
+            deadline (float): time.perf_counter() value to stop drawing at,
+                              or None to finish the layer
+
+        Returns:
+            bool: Whether the layer is finished
         """
-        sprite_matrix = []
+        grid = self.get_grid()
+        rows, columns = grid.shape
+
+        if self._background is None:
+            background = pygame.Surface((columns * TILE_SIZE, rows * TILE_SIZE))
+
+            if pygame.display.get_surface() is not None:
+                background = background.convert()
+
+            self._background = background
+            self._background_rows = 0
 
-        tile_set = TileSet()
+        tiles = get_shared_tile_set().tiles_by_id
 
-        for column in range(len(self._matrix)):
-            sprite_matrix.append(pygame.sprite.Group())
+        while self._background_rows < rows:
+            if deadline is not None and time.perf_counter() >= deadline:
+                return False
 
-            for row in range(len(self._matrix[0])):
-                sprite_matrix[column].add(
-                    tile_set.get_tile(self._matrix[column][row])
-                )
+            row_index = self._background_rows
+            self._background.blits([
+                (tiles[tile_id].image, (col_index * TILE_SIZE, row_index * TILE_SIZE))
+                for col_index, tile_id in enumerate(grid[row_index].tolist())
+            ], doreturn=False)
+            self._background_rows += 1
 
-        self._sprite_matrix = sprite_matrix
+        return True
 
     def get_available_directions(self) -> List[str]:
         """Returns the unoccupied directions for the room
@@ -0,0 +1,98 @@
+"""Pre-rotated sprite frames, so nothing is rotated inside the frame loop"""
+import pygame
+
+from common import assets
+
+# Number of angle buckets used when none is given
+DEFAULT_BUCKETS = 64
+
+
+class RotationCache:
+    """Holds a copy of an image rotated to each of a fixed number of angles.
+
+    Angles are snapped to the nearest bucket, so looking up a rotation is a
+    table lookup instead of a call to pygame.transform.rotate.
+
+    Args:
+        image (pygame.Surface): The unrotated image
+        buckets (int): How many evenly spaced angles to pre-render
+
+    Attributes:
+        _frames (list): One rotated Surface per bucket
+        _offsets (list): Per bucket, the x/y offset of the rotated frame's
+                         top-left that keeps it centred on the unrotated image
+    """
+    def __init__(self, image: pygame.Surface, buckets: int = DEFAULT_BUCKETS) -> None:
+        self._buckets = buckets
+        self._step = 360 / buckets
+        self._frames = []
+        self._offsets = []
+
+        center = image.get_rect().center
+
+        for bucket in range(buckets):
+            rotated = pygame.transform.rotate(image, bucket * self._step)
+            rect = rotated.get_rect(center=center)
+
+            self._frames.append(rotated)
+            self._offsets.append((rect.x, rect.y))
+
+    def __len__(self) -> int:
+        return self._buckets
+
+    # Methods
+    # ----------------------------------------------------------------------
+    def get_bucket(self, angle: float) -> int:
+        """Return the bucket an angle snaps to
+
+        Args:
+            angle (float): Angle in degrees
+
+        Returns:
+            int: Index of the closest pre-rendered angle
+        """
+        return int(round(angle / self._step)) % self._buckets
+
+    def get_image(self, angle: float) -> pygame.Surface:
+        """Return the image rotated to the closest cached angle
+
+        Args:
+            angle (float): Angle in degrees
+
+        Returns:
+            pygame.Surface: The shared rotated image. Do not draw on it.
+        """
+        return self._frames[self.get_bucket(angle)]
+
+    def get_offset(self, angle: float) -> tuple:
+        """Return the offset that keeps a rotated frame centred
+
+        Args:
+            angle (float): Angle in degrees
+
+        Returns:
+            tuple: x/y offset from the unrotated image's top-left
+        """
+        return self._offsets[self.get_bucket(angle)]
+
+
+# Caches shared by every sprite, keyed on (image path, buckets)
+_caches = {}
+
+
+def get_rotation_cache(img_path: str, buckets: int = DEFAULT_BUCKETS) -> RotationCache:
+    """Return the shared rotation cache for an image, building it on first use
+
+    Args:
+        img_path (str): Absolute path of the image
+        buckets (int): How many evenly spaced angles to pre-render
+
+    Returns:
+        RotationCache: The cache for that image
+    """
+    key = (img_path, buckets)
+
+    if key not in _caches:
+        _caches[key] = RotationCache(assets.load_image(img_path), buckets)
+
+    return _caches[key]
@@ -8,25 +8,43 @@ from common.state import State
 from common.hud import HeadsUpDisplay
 from common.entity import Actor
 from common.menu import Menu
+from common.projectile_buffer import ProjectileBuffer
 
 
 class Scene():
     """Class representing the Scene (window), which is a reflection of the game state
 
+    Args:
+        dirty_rects (bool): Only repaint and push the regions that changed
+                            between frames instead of the whole window
+
     Attributes:
         tile_size (int): Size of tiles, in pixels
         width (int): Width of the scene, in pixels
         height (int): Height of the scene, in pixels
         window (Surface): pygame surface which represents objects
+        dirty_rects (bool): Whether dirty-rect rendering is enabled
+        drawn_rects (list): Rects drawn over the background last frame
+        hud_rects (list): Rects the HUD layer covered last frame
+        update_rects (list): Regions to push to the display, or None for all of it
+        background (Surface): The room background drawn last frame
+        menu_screen (Surface): The menu screen on the window, or None during play
     """
-    def __init__(self, width, height):
+    def __init__(self, width, height, dirty_rects: bool = False):
         self._tile_size = 32
         self._width = width
         self._height = height
         self._window = pygame.display.set_mode((width, height))
-        self._hud = HeadsUpDisplay()
+        self._hud = HeadsUpDisplay((width, height))
         self._menu = Menu((width, height))
 
+        self._dirty_rects = dirty_rects
+        self._drawn_rects: List[pygame.Rect] = []
+        self._hud_rects: List[pygame.Rect] = []
+        self._update_rects: List[pygame.Rect] = None
+        self._background: pygame.Surface = None
+        self._menu_screen: pygame.Surface = None
+
     def get_menu(self) -> Menu:
         """Return the menu object"""
         return self._menu
@@ -37,67 +55,88 @@ class Scene():
         """Fill in the window background with RGB 0,0,255 (blue)"""
         self._window.fill((0, 0, 255))
 
+    def get_room_offset(self) -> tuple:
+        """Return the x/y offsets that center the room in the window"""
+        col_offset = (self._width - 40 * self._tile_size) // 2
+        row_offset = (self._height - 24 * self._tile_size) // 2
+        return (col_offset, row_offset)
+
     def draw_room(self, room: Room):
-        """Draw a simple array of squares corresponding to an array
+        """Draw the room's cached background layer
 
         Args:
             room (Room): The current room
         """
+        self._window.blit(room.get_background(), self.get_room_offset())
 
-        # Get the 2d array representing the room
-        room_array = room.get_sprite_matrix()
-
-        # Calculate the x/y offsets to center the room
-        col_offset = (self._width - 40 * self._tile_size) / 2
-        row_offset = (self._height - 24 * self._tile_size) / 2
-
-        for row in room_array:
-            row.draw(self._window)
+    def restore_background(self, room: Room, rects: List[pygame.Rect]):
+        """Repaint the room background under some rects
 
-        # Draw the sprite for each tile
-        for col_index in range(len(room_array[0].sprites())):
-            for row_index, row in enumerate(room_array):
-                sprite = row.sprites()[col_index]
-
-                sprite.rect = pygame.Rect(
-                    (col_offset + col_index * self._tile_size, row_offset + row_index * self._tile_size),
-                    (32, 32)
-                )
+        Args:
+            room (Room): The current room
+            rects (List[pygame.Rect]): The regions to repaint
+        """
+        background = room.get_background()
+        col_offset, row_offset = self.get_room_offset()
 
-                pygame.Surface.blit(self._window, sprite.image, sprite.rect)
+        for rect in rects:
+            self._window.fill((0, 0, 0), rect)
+            self._window.blit(background, rect, rect.move(-col_offset, -row_offset))
 
-    def draw_player(self, player: Actor):
+    def draw_player(self, player: Actor) -> List[pygame.Rect]:
         """Draw the player to the screen
 
         Args:
             player (Actor): A player object
+
+        Returns:
+            list: The rects that were drawn to
         """
-        self._window.blit(player.image, player.coords)
+        return [self._window.blit(player.image, player.coords)]
 
-    def draw_actors(self, actors: List[Actor]):
+    def draw_actors(self, actors: List[Actor]) -> List[pygame.Rect]:
         """Draws the currently active Actors
         Args:
             actors (List[Actor]): A group of actors
+
+        Returns:
+            list: The rects that were drawn to
         """
-        for actor in actors:
-            self._window.blit(actor.image, actor.coords)
+        return [self._window.blit(actor.image, actor.coords) for actor in actors]
 
-    def draw_dropped_items(self, items: list):
-        for item in items:
-            self._window.blit(item.image, item.coords)
+    def draw_dropped_items(self, items: list) -> List[pygame.Rect]:
+        return [self._window.blit(item.image, item.coords) for item in items]
 
-    def draw_projectiles(self, projectiles: List):
-        """Draws the currently active projectiles
+    def draw_projectiles(self, projectiles: ProjectileBuffer) -> List[pygame.Rect]:
+        """Draws the currently active projectiles in a single batch
 
         Args:
-            projectiles (List[Projectile]): A list of projectiles
+            projectiles (ProjectileBuffer): The live projectiles
+
+        Returns:
+            list: The rects that were drawn to, if dirty rects are enabled
         """
-        for projectile in projectiles:
-            self._window.blit(projectile.image, projectile.coords)
+        rects = self._window.blits(projectiles.get_blit_sequence(), doreturn=self._dirty_rects)
+        return rects or []
 
     def draw_menu(self, screen: Enum):
         self._menu.draw_menu(screen)
 
+    def draw_menu_screen(self, screen: pygame.Surface):
+        """Show a composed menu screen, only blitting and pushing it when it changes
+
+        Args:
+            screen (Surface): The menu screen to show
+        """
+        if screen is self._menu_screen:
+            # Already on the display, so there is nothing to push
+            self._update_rects = []
+            return
+
+        self.invalidate()
+        self._window.blit(screen, (0, 0))
+        self._menu_screen = screen
+
     def draw_state(self, state: State):
         """Draw a given state
 
@@ -105,17 +144,53 @@ class Scene():
             state: State a state object
         """
         if not state.started:
-            self._menu.draw_main_menu()
+            self.draw_menu_screen(self._menu.get_main_menu())
         elif state.game_is_over():
-            self._menu.draw_game_over()
+            self.draw_menu_screen(self._menu.get_game_over())
         elif state.paused:
-            self._menu.draw_pause_menu()
+            self.draw_menu_screen(self._menu.get_pause_menu())
         else:
+            self._menu_screen = None
+            background = state.room.get_background()
+            # Re-render HUD widgets whose values changed
+            hud_rects = self._hud.update(state)
+
+            if not self._dirty_rects or background is not self._background:
+                # Redraw the whole room and push the whole window
+                self.draw_room(state.room)
+                self._update_rects = None
+            else:
+                # Only repaint where something was drawn last frame. The HUD
+                # is blended, so it is repainted under too, but only pushed
+                # to the display where a widget changed.
+                self.restore_background(state.room, self._drawn_rects + self._hud_rects + hud_rects)
+                self._update_rects = self._drawn_rects + hud_rects
+
             # Draw game objects
-            self.draw_room(state.room)
-            self.draw_player(state.player)
-            self.draw_actors(state.actors)
-            self.draw_projectiles(state.projectiles)
-            self.draw_dropped_items(state.get_dropped_items())
-            # Then draw the HUD
-            self._hud.draw_overlay(self._window, state)
+            drawn_rects = self.draw_player(state.player)
+            drawn_rects += self.draw_actors(state.actors)
+            drawn_rects += self.draw_projectiles(state.projectiles)
+            drawn_rects += self.draw_dropped_items(state.get_dropped_items())
+            # Then draw the HUD layer, which is redrawn every frame
+            self._hud_rects = self._hud.draw(self._window)
+
+            if self._dirty_rects:
+                self._background = background
+                self._drawn_rects = drawn_rects
+
+                if self._update_rects is not None:
+                    self._update_rects += drawn_rects
+
+    def invalidate(self):
+        """Make the next frame redraw and push the whole window"""
+        self._background = None
+        self._drawn_rects = []
+        self._hud_rects = []
+        self._update_rects = None
+
+    def present(self):
+        """Push the frame to the display, only the changed regions if possible"""
+        if self._update_rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self._update_rects)
@@ -0,0 +1,130 @@
+"""Uniform-grid spatial hash used as a broadphase for entity overlap checks"""
+from typing import List
+
+import pygame
+
+from common.collision import TILE_SIZE
+
+
+class SpatialHash:
+    """Buckets entities by the grid cells their rects overlap so overlap
+    queries only visit nearby cells instead of every entity in the room.
+
+    Entities are re-bucketed incrementally with update(), which does no work
+    unless the entity has crossed into a different set of cells.
+
+    Args:
+        cell_size (int): Size of a cell, in pixels. Defaults to one tile.
+
+    Attributes:
+        _cells (dict): Maps (column, row) cells to the entities in them
+        _spans (dict): Maps each entity to the span of cells it occupies
+    """
+    def __init__(self, cell_size: int = TILE_SIZE) -> None:
+        self._cell_size = cell_size
+        self._cells = {}
+        self._spans = {}
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def __contains__(self, entity) -> bool:
+        return entity in self._spans
+
+    # Methods
+    # ----------------------------------------------------------------------
+    def get_span(self, rect: pygame.Rect) -> tuple:
+        """Returns the span of cells a rect overlaps
+
+        Args:
+            rect (pygame.Rect): The rect to look up
+
+        Returns:
+            tuple: (first_column, first_row, last_column, last_row), inclusive
+        """
+        size = self._cell_size
+        return (
+            rect.left // size,
+            rect.top // size,
+            (rect.right - 1) // size if rect.width > 0 else rect.left // size,
+            (rect.bottom - 1) // size if rect.height > 0 else rect.top // size
+        )
+
+    def insert(self, entity) -> None:
+        """Add an entity to the hash
+
+        Args:
+            entity (Entity): The entity to add
+        """
+        span = self.get_span(entity.rect)
+        self._spans[entity] = span
+        self._add_to_cells(entity, span)
+
+    def remove(self, entity) -> None:
+        """Remove an entity from the hash, if present
+
+        Args:
+            entity (Entity): The entity to remove
+        """
+        span = self._spans.pop(entity, None)
+        if span is not None:
+            self._remove_from_cells(entity, span)
+
+    def update(self, entity) -> None:
+        """Re-bucket an entity after it has moved
+
+        Args:
+            entity (Entity): The entity that moved
+        """
+        old_span = self._spans.get(entity)
+        new_span = self.get_span(entity.rect)
+
+        if old_span == new_span:
+            return
+
+        if old_span is not None:
+            self._remove_from_cells(entity, old_span)
+
+        self._spans[entity] = new_span
+        self._add_to_cells(entity, new_span)
+
+    def clear(self) -> None:
+        """Remove every entity from the hash"""
+        self._cells.clear()
+        self._spans.clear()
+
+    def query(self, rect: pygame.Rect) -> List:
+        """Returns the entities whose rects overlap a rect
+
+        Args:
+            rect (pygame.Rect): The rect to check
+
+        Returns:
+            List[Entity]: The overlapping entities
+        """
+        first_column, first_row, last_column, last_row = self.get_span(rect)
+
+        found = {}
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                bucket = self._cells.get((column, row))
+                if bucket:
+                    found.update(bucket)
+
+        return [entity for entity in found if entity.rect.colliderect(rect)]
+
+    def _add_to_cells(self, entity, span: tuple) -> None:
+        first_column, first_row, last_column, last_row = span
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                self._cells.setdefault((column, row), {})[entity] = None
+
+    def _remove_from_cells(self, entity, span: tuple) -> None:
+        first_column, first_row, last_column, last_row = span
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                bucket = self._cells.get((column, row))
+                if bucket is not None:
+                    bucket.pop(entity, None)
+                    if not bucket:
+                        del self._cells[(column, row)]
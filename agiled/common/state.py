@@ -1,26 +1,45 @@
 """Class which holds the current state of the game"""
 
 import math
+import random
 from typing import List
 
 import pygame
-from pygame.locals import K_w, K_s, K_a, K_d, K_1, K_2, K_3, K_4, K_5
 
 from common import audio
-from common.entity import DroppedItem, Player, Enemy, Actor, Boss
+from common.entity import Player, Enemy, Actor, Boss
+from common.entity import ENEMY_POOL, DROPPED_ITEM_POOL
 from common.potion import Potion, PotionFactory
 from common.item import Key
 from common.room import Room, SpawnLocations
 from common.weapon import Weapon
 from common.map_generator import DungeonGenerator
 from common.boots import Boots
+from common.spatial_hash import SpatialHash
+from common.collision import segment_rect_intersection
+from common.enemy_ai import EnemyBatch, update_enemies
+from common.projectile_buffer import ProjectileBuffer, OWNER_PLAYER
+from common.input import InputProvider, InputSnapshot, IDLE_SNAPSHOT, PygameInputProvider
 
 SCORE_MULTIPLIER = 10
 
 class State:
-    """Class which holds the current state of the game"""
+    """Class which holds the current state of the game
 
-    def __init__(self) -> None:
+    Args:
+        input_provider (InputProvider): Where player input comes from, once
+                                        per tick. Defaults to the live
+                                        keyboard and mouse
+        seed (int): Seed for the first dungeon and everything random after
+                    it, so runs with the same seed and input play out the
+                    same. A random one is picked if None
+    """
+
+    def __init__(self, input_provider: InputProvider = None, seed: int = None) -> None:
+        self._seed = seed if seed else random.randrange(1, 2 ** 31)
+        self._input_provider = input_provider if input_provider is not None else PygameInputProvider()
+        self._input_provider.attach(self)
+        self._input = IDLE_SNAPSHOT
         self._paused = True
         self._started = False
 
@@ -37,16 +56,26 @@ class State:
         self._player = None
         self._game_over = False
         self._actors = []
-        self._projectiles = []
 
         # Set the background music
         self._background_music = None
         self.change_background_music(audio.Music.Song.DUNGEON01)
 
         # Currently active projectiles
-        self._projectiles = []
+        self._projectiles = ProjectileBuffer()
         self._dropped_items = []
 
+        # Broadphase indexes for entity-vs-entity overlap checks
+        self._actor_hash = SpatialHash()
+        self._dropped_item_hash = SpatialHash()
+
+        # Fields leading chasing enemies to the player, by enemy size in
+        # tiles, rebuilt when the player changes tile
+        self._flow_fields = {}
+
+        # The enemies laid out in arrays, while there are enough to batch
+        self._enemy_batch = EnemyBatch()
+
         # Number of enemies killed by player
         self._num_dead_enemies = 0
 
@@ -87,7 +116,7 @@ class State:
         """
         return self._player
 
-    def get_projectiles(self) -> List:
+    def get_projectiles(self) -> ProjectileBuffer:
         """Return the currently active projectiles
 
         Return:
@@ -103,6 +132,10 @@ class State:
         """
         return self._score
 
+    def get_kills(self) -> int:
+        """Return the number of enemies killed since the player spawned"""
+        return self._num_dead_enemies
+
     def get_dropped_items(self) -> List:
         return self._dropped_items
 
@@ -114,6 +147,18 @@ class State:
         """Return if game is started"""
         return self._started
 
+    def get_seed(self) -> int:
+        """Return the seed the run was started from"""
+        return self._seed
+
+    def get_input_provider(self) -> InputProvider:
+        """Return where player input comes from"""
+        return self._input_provider
+
+    def get_input_snapshot(self) -> InputSnapshot:
+        """Return the input sampled for the current tick"""
+        return self._input
+
     # Setters
     # ----------------------------------------------------------------------
     def set_root(self, root: Room) -> None:
@@ -170,18 +215,36 @@ class State:
     # ----------------------------------------------------------------------
 
     def clear_entities(self):
-        self._projectiles = []
+        # Hand the outgoing entities back to their pools, once the batch
+        # has given them back their state
+        self._enemy_batch.release()
+        self.release_actors(self._actors)
+        DROPPED_ITEM_POOL.release_all(self._dropped_items)
+
+        self._projectiles.clear()
         self._actors = []
         self._dropped_items = []
 
+        self._actor_hash.clear()
+        self._dropped_item_hash.clear()
+
+    def release_actors(self, actors: List[Actor]) -> None:
+        """Give pooled actors back to the enemy pool
+
+        Args:
+            actors (List[Actor]): Actors that are no longer in play
+        """
+        ENEMY_POOL.release_all(actor for actor in actors if type(actor) is Enemy)
+
     def game_is_over(self):
         return self._game_over
 
     def enter_new_dungeon(self):
         self.clear_entities()
 
+        # The first dungeon seeds the random stream, later ones continue it
         map_generator = DungeonGenerator()
-        self._root = map_generator.generate_map(None, 5)
+        self._root = map_generator.generate_map(self._seed if self._root is None else None, 5)
 
         self._room_count += 1
         self.set_room(self._root)
@@ -192,6 +255,7 @@ class State:
         """Respawn player"""
         self.set_room(self._root)
         self._room_count = 0
+        self._num_dead_enemies = 0
         self.score = 0
 
         self._player = Player()
@@ -236,16 +300,16 @@ class State:
 
     def update(self) -> None:
         """Updates the game's state"""
+        # Sample input once for the whole tick
+        self._input = self._input_provider.poll(self)
+
         # self.check_important_keys(events)
         if not self._paused:
             self.update_player()
-            # update enemy Movement
+            # update enemy Movement, all at once
+            update_enemies(self.actors, self._player.rect, self.room, self._flow_fields, self._enemy_batch)
             for enemy in self.actors:
-                enemy.check_for_trigger(self._player)
-                if enemy.is_triggered():
-                    self.make_enemy_chase(enemy, self._player)
-                else:
-                    self.move_enemy(enemy)
+                self._actor_hash.update(enemy)
             self.update_environment()
 
     def update_player(self):
@@ -289,20 +353,7 @@ class State:
     def check_item_keys(self):
         """Checks if any item activating keys are pressed
         and uses accordingly"""
-        keys = pygame.key.get_pressed()
-
-        key = None
-
-        if keys[K_1]:
-            key = 0
-        elif keys[K_2]:
-            key = 1
-        elif keys[K_3]:
-            key = 2
-        elif keys[K_4]:
-            key = 3
-        elif keys[K_5]:
-            key = 4
+        key = self._input.item_slot
 
         if key is not None:
             self._player.use_item(key)
@@ -327,49 +378,143 @@ class State:
 
     def kill_dead_enemies(self):
         """Kills the dead enemies"""
+        if not any(enemy.is_dead() for enemy in self._actors):
+            return
+
+        # The dead go back to the pool, so the batch lets go of them first
+        self._enemy_batch.release()
+        survivors = []
+
         for enemy in self._actors:
             # If the enemy is dead, remove it
             if enemy.is_dead():
-                new_item = DroppedItem(None)
+                new_item = DROPPED_ITEM_POOL.acquire(None)
                 new_item.set_coords(enemy.coords)
-                self._actors.remove(enemy)
+                self._actor_hash.remove(enemy)
+                self.release_actors([enemy])
                 self._num_dead_enemies += 1
                 self._dropped_items.append(new_item)
+                self._dropped_item_hash.insert(new_item)
+            else:
+                survivors.append(enemy)
+
+        self._actors = survivors
 
     def check_dropped_item_collision(self) -> None:
         """Act on dropped item collision"""
-        collision = pygame.sprite.spritecollide(self.player,self._dropped_items, False)
+        collision = self._dropped_item_hash.query(self.player.rect)
 
         for col in collision:
             self.score += SCORE_MULTIPLIER
-            self._dropped_items.remove(col)
+            self._dropped_item_hash.remove(col)
+            DROPPED_ITEM_POOL.release(col)
+
+        if collision:
+            self._dropped_items = [item for item in self._dropped_items if item in self._dropped_item_hash]
 
 
     def check_projectile_collision(self) -> None:
-        """Act on projectile collision"""
+        """Act on projectile collision
+
+        Every projectile is advanced at once, then each sweeps the segment
+        between its old and new position, so fast projectiles hit the first
+        wall or target in their path instead of tunnelling through it.
 
-        # Iterate through each projectile and check if it can move
-        for proj in self.projectiles:
+        Walls and enemies are both grown by the projectile's size, so a
+        projectile stops as soon as its rect touches either. A projectile
+        fired while already touching a wall stops once its centre enters it.
+        """
+        projectiles = self._projectiles
+        if not projectiles:
+            return
 
-            # If it cant move, it has collided, so remove it
-            if not self.move_entity_if_possible(proj.speed, proj):
-                self.projectiles.remove(proj)
+        collision_map = self._room.get_collision_map()
 
-            elif proj.is_out_of_range():
-                self.projectiles.remove(proj)
+        start_x, start_y = projectiles.get_centers()
+        projectiles.advance()
+        end_x, end_y = projectiles.get_centers()
 
-        # Check every enemy to see if it has been collided with a sprite
-        for enemy in self._actors:
-            # Get projectiles that collide with the current enemy
-            collision = pygame.sprite.spritecollide(enemy, self.projectiles, False)
+        keep = ~projectiles.get_out_of_range()
+        widths, heights = projectiles.get_sizes()
+        damage = projectiles.get_damage().tolist()
+        owners = projectiles.get_owners().tolist()
+
+        # Only projectiles with a wall near their path are swept against walls
+        near_walls = collision_map.get_sweeps_near_walls(start_x, start_y, end_x, end_y, widths, heights)
+
+        paths = zip(start_x.tolist(), start_y.tolist(), end_x.tolist(), end_y.tolist(),
+                    widths.tolist(), heights.tolist(), near_walls.tolist())
+
+        for index, (x_start, y_start, x_end, y_end, width, height, near_wall) in enumerate(paths):
+            start, end = (x_start, y_start), (x_end, y_end)
+
+            # First impassable tile the projectile's rect runs into, if any
+            wall_hit = collision_map.sweep_box(start, end, (width, height)) if near_wall else None
+            wall_t = wall_hit[0] if wall_hit else None
+
+            if owners[index] == OWNER_PLAYER:
+                target, target_t = self.get_first_enemy_hit(start, end, (width, height))
+            else:
+                target, target_t = self.get_player_hit(start, end, (width, height))
+
+            if target is not None and (wall_t is None or target_t <= wall_t):
+                target.take_damage(damage[index])
+                keep[index] = False
+
+            elif wall_t is not None:
+                keep[index] = False
+
+        projectiles.compact(keep)
+
+    def get_first_enemy_hit(self, start: tuple, end: tuple, size: tuple) -> tuple:
+        """Find the first enemy a projectile's path runs into
+
+        Args:
+            start (tuple): Centre of the projectile before moving
+            end (tuple): Centre of the projectile after moving
+            size (tuple): Width/height of the projectile
+
+        Returns:
+            tuple: (enemy, t) for the closest enemy hit, or (None, None)
+        """
+        if not self._actors:
+            return None, None
+
+        width, height = size
+
+        # Only enemies near the swept path are tested
+        sweep = pygame.Rect(
+            min(start[0], end[0]), min(start[1], end[1]),
+            abs(end[0] - start[0]) + 1, abs(end[1] - start[1]) + 1
+        ).inflate(width, height)
+
+        first_enemy, first_t = None, None
+        for enemy in self._actor_hash.query(sweep):
+            # Growing the enemy by the projectile's size lets its centre
+            # stand in for the whole projectile
+            t = segment_rect_intersection(start, end, enemy.rect.inflate(width, height))
+
+            if t is not None and (first_t is None or t < first_t):
+                first_enemy, first_t = enemy, t
+
+        return first_enemy, first_t
+
+    def get_player_hit(self, start: tuple, end: tuple, size: tuple) -> tuple:
+        """Check if an enemy projectile's path runs into the player
+
+        Args:
+            start (tuple): Centre of the projectile before moving
+            end (tuple): Centre of the projectile after moving
+            size (tuple): Width/height of the projectile
 
-            # For each collision
-            for col in collision:
-                # Take the damage from the enemy's hitpoints
-                enemy.take_damage(col.damage)
+        Returns:
+            tuple: (player, t) if the player is hit, or (None, None)
+        """
+        t = segment_rect_intersection(start, end, self._player.rect.inflate(size[0], size[1]))
 
-                # Remove the projectile
-                self.projectiles.remove(col)
+        if t is None:
+            return None, None
+        return self._player, t
 
     def check_user_click(self) -> None:
         """User click behavior"""
@@ -380,13 +525,13 @@ class State:
             player.shot_timer -= 1
 
         # Check if MB1 is pressed
-        mb1_is_down = pygame.mouse.get_pressed()[0]
+        mb1_is_down = self._input.fire
 
         if mb1_is_down:
             if player.can_shoot():
                 # Get the player and mouse coordinates
                 player_coords = player.coords
-                mouse_coords = pygame.mouse.get_pos()
+                mouse_coords = self._input.aim
 
                 # We'll  use a little trig to make normalizing
                 # the direction vector easier
@@ -408,46 +553,49 @@ class State:
 
                 angle = calculate_mouse_angle(opp, adj)
 
-                # Create a new projectile from player
-                new_proj = player.generate_attack((x_speed, y_speed), angle)
-
-                # Add the new projectile to the state
-                self.projectiles.append(new_proj)
+                # Fire a new projectile from the player into the state
+                player.generate_attack((x_speed, y_speed), angle, self._projectiles)
 
                 # Play bow sound effect
-                sound_effect = audio.SoundEffect(audio.SoundEffect.Effect.ARROW)
-                sound_effect.play()
+                audio.SOUND_BANK.play(audio.SoundEffect.Effect.ARROW)
 
     def get_enemies_colliding_with_player(self) -> List[Actor]:
         """Get all the enemies currently colliding with the player
 
         Returns:
-            A list of actors colliding with the player
+            A list of actors colliding with the player, in the order of
+            the actors list, so the same enemy's hit lands every time
         """
-        # Get all the sprites currently colliding with the player
-        return pygame.sprite.spritecollide(self.player, self._actors, False)        
+        # Get all the actors sharing grid cells and colliding with the player
+        enemies = self._actor_hash.query(self.player.rect)
+
+        # The hash returns them in cell order; there are rarely more than a few
+        if len(enemies) > 1:
+            enemies.sort(key=self._actors.index)
+
+        return enemies
 
     def initialize_room(self):
         """Initializes the current room"""
 
-        # Iterate through each row
-        spawned_boss = False
-        for row_index, row in enumerate(self.room.get_sprite_matrix()):
-            for col_index, col in enumerate(row.sprites()):
-                # If the tile is an enemy spawnpoint, add the enemy
-                if col.is_spawnpoint:
-                    temp_enemy = Enemy()
-                    spawn_x = col_index * 32 + ((32 - temp_enemy.rect.width) / 2)
-                    spawn_y = row_index * 32 + ((32 - temp_enemy.rect.height) / 2)
-                    temp_enemy.coords = (spawn_x, spawn_y)
-
-                    self._actors.append(temp_enemy)
-
-                if col.is_portal and not spawned_boss:
-                    temp_boss = Boss()
-                    temp_boss.coords = (col_index * 32, row_index * 32)
-                    self._actors.append(temp_boss)
-                    spawned_boss = True
+        # Add an enemy on every spawnpoint
+        for row_index, col_index in self.room.get_spawn_points().tolist():
+            temp_enemy = ENEMY_POOL.acquire()
+            spawn_x = col_index * 32 + ((32 - temp_enemy.rect.width) / 2)
+            spawn_y = row_index * 32 + ((32 - temp_enemy.rect.height) / 2)
+            temp_enemy.coords = (spawn_x, spawn_y)
+
+            self._actors.append(temp_enemy)
+            self._actor_hash.insert(temp_enemy)
+
+        # Add a boss on the first portal
+        portals = self.room.get_portal_positions().tolist()
+        if portals:
+            row_index, col_index = portals[0]
+            temp_boss = Boss()
+            temp_boss.coords = (col_index * 32, row_index * 32)
+            self._actors.append(temp_boss)
+            self._actor_hash.insert(temp_boss)
 
         # Set the room to initialized
         self.room.set_initialized(True)
@@ -455,31 +603,9 @@ class State:
     def move_player(self):
         """Update the player's movement"""
 
-        # Get currently pressed keys
-        keys = pygame.key.get_pressed()
-
-        # Change in X/Y coordinate
-        x_change, y_change = (0, 0)
-
-        # Check for WSAD pressed and set x/y changes accordingly
-
-        # Check for W or S
-        if keys[K_w]:
-            y_change = -1 * self._player.get_speed()
-        if keys[K_s]:
-            y_change = self._player.get_speed()
-
-        # Check for A or D
-        if keys[K_a]:
-            x_change = -1 * self._player.get_speed()
-        if keys[K_d]:
-            x_change = self._player.get_speed()
-
-        # If both, stop movement
-        if keys[K_s] and keys[K_w]:
-            y_change = 0
-        if keys[K_a] and keys[K_d]:
-            x_change = 0
+        # Change in X/Y coordinate, from this tick's input
+        x_change = self._input.move_x * self._player.get_speed()
+        y_change = self._input.move_y * self._player.get_speed()
 
         # Move the player in changes if available
         if x_change != 0:
@@ -487,73 +613,6 @@ class State:
         if y_change != 0:
             self.move_entity_if_possible([0, y_change], self.player)
 
-    def move_enemy(self, enemy: Actor):
-        vectors = [[0, 1], [0, -1], [1, 0], [-1, 0], [1, 1], [1, -1], [-1, -1], [-1, 1]]
-
-        if enemy.get_distance() <= 0:
-            enemy.get_new_direction()
-
-        direction = vectors[enemy.get_direction()]
-
-        if self.entity_can_move(direction, enemy):
-            self.move_entity_if_possible(direction, enemy)
-            enemy.set_distance(-1)
-        else:
-            enemy.get_new_direction()
-
-    def make_enemy_chase(self, enemy, player: Actor):
-        # Find direction vector (dx, dy) between enemy and player.
-        vect = pygame.math.Vector2(player.rect.x - enemy.rect.x, player.rect.y - enemy.rect.y)
-
-        dx = player.rect.x - enemy.rect.x
-        dy = player.rect.y - enemy.rect.y
-        dist = math.hypot(dx, dy)
-
-        if player.rect.x > enemy.rect.x:
-            x = 1
-        else:
-            x = -1
-
-        if player.rect.y > enemy.rect.y:
-            y = 1
-        else:
-            y = -1
-
-        if dist > 3 and self.entity_can_move([x, y], enemy):
-            # Move along this normalized vector towards the player at charging speed enemy cannot share exact
-            # coordinates with player
-            vect.scale_to_length(enemy.get_charge_speed())
-            enemy.rect.move_ip(vect)
-        #else:
-            #enemy.set_triggered(False)
-            #self.move_enemy(enemy)
-
-    def entity_can_move(self, change, entity) -> bool:
-        """Check if a move is possible for an entity"""
-        # Room matrix
-        room_array = self.room.get_sprite_matrix()
-
-        # Get the entities old position
-        old_pos = entity.coords
-
-        # Update the player for the frame
-        entity.update_position(change)
-
-        # For every row, check for sprite collision between the player and any tile
-        for row in room_array:
-
-            # Get all the sprites currently colliding with the player
-            for collision in pygame.sprite.spritecollide(entity, row, False):
-
-                # If the colliding sprite isn't passable, set the player's coordinates
-                # to their old coordinates before moving
-                if not collision.is_passable:
-                    entity.coords = old_pos
-                    return False
-
-        entity.coords = old_pos
-        return True
-
     def move_entity_if_possible(self, change: tuple, entity: Actor) -> bool:
         """Update the moves the player if possible
 
@@ -565,8 +624,8 @@ class State:
             bool: Whether entity was able to move
         """
 
-        # Room matrix
-        room_array = self.room.get_sprite_matrix()
+        # Room collision map
+        collision_map = self.room.get_collision_map()
 
         # Get the player's old position
         old_pos = entity.coords
@@ -574,54 +633,69 @@ class State:
         # Update the player for the frame
         entity.update_position(change)
 
-        # For every row, check for sprite collision between the player and any tile
-        for row in room_array:
+        # Check every tile the entity now overlaps
+        for collision in collision_map.get_tiles_colliding_with(entity.rect):
 
-            # Get all the sprites currently colliding with the player
-            for collision in pygame.sprite.spritecollide(entity, row, False):
-
-                # If the colliding sprite isn't passable, set the player's coordinates
-                # to their old coordinates before moving
-                if not collision.is_passable and (not collision.is_door or self._actors):
-                    entity.coords = old_pos
-                    return False
-                if collision.is_door:
-                    return False
+            # If the colliding tile isn't passable, set the player's coordinates
+            # to their old coordinates before moving
+            if not collision.is_passable and (not collision.is_door or self._actors):
+                entity.coords = old_pos
+                return False
+            if collision.is_door:
+                return False
 
         return True
 
     def check_tile_behavior(self) -> None:
         """Checks for tiles that have behavior"""
 
-        # Room matrix
-        room_array = self._room.get_sprite_matrix()
+        # Room collision map
+        collision_map = self._room.get_collision_map()
 
         # Player
         player = self.player
 
         through_door = False
 
-        # Loop through each row
-        for row in room_array:
+        # For each tile the player overlaps
+        for collision in collision_map.get_tiles_colliding_with(player.rect):
+            # Do behavior if avialable
+            if collision.has_behavior:
+                collision.behavior(self)
 
-            # For each colliding tile
-            for collision in pygame.sprite.spritecollide(player, row, False):
-                # Do behavior if avialable
-                if collision.has_behavior:
-                    collision.behavior(self)
+            if collision.is_damaging and player.can_be_damaged():
+                # Set damage timer to 30 ticks
+                player.take_damage(5)
 
-                if collision.is_damaging and player.can_be_damaged():
-                    # Set damage timer to 30 ticks
-                    player.take_damage(5)
+            if collision.is_door and not through_door:
+                self.send_player_through_door(collision.door_type)
+                through_door = True
 
-                if collision.is_door and not through_door:
-                    self.send_player_through_door(collision.door_type)
+            if collision.is_portal and not through_door:
+                if not self._actors:
                     through_door = True
+                    self.enter_new_dungeon()
+
+    def warm_up_rooms(self, deadline: float) -> bool:
+        """Prepares the rooms next to the current one, in time to spare
+
+        Their tiles and background layers are built so walking through a
+        door doesn't have to. Enemies are still spawned on entry, since
+        spawning draws from the seeded random stream and has to happen at
+        the same tick on every run.
+
+        Args:
+            deadline (float): time.perf_counter() value to stop working at
 
-                if collision.is_portal and not through_door:
-                    if not self._actors:
-                        through_door = True
-                        self.enter_new_dungeon()
+        Returns:
+            bool: Whether every neighbouring room is ready
+        """
+        for direction in ("north", "south", "east", "west"):
+            room = self._room.get_room_at_direction(direction)
+            if room is not None and not room.render_background(deadline):
+                return False
+
+        return True
 
     def send_player_through_door(self, door_type):
         self.traverse_room(door_type)
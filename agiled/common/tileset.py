@@ -1,35 +1,63 @@
 """Contains the TileSet and Tile classes"""
-from enum import Enum
+from enum import Enum, IntFlag
+import numpy as np
 import pygame
-from common import util
+from common import assets, util
 
 
-class Tile(pygame.sprite.Sprite):
-    """Class representing a single room tile
+class Tile:
+    """Class describing one kind of room tile.
+
+    Tiles are flyweights: the TileSet builds a single Tile for each TileName
+    and every cell of every room refers to that shared, read-only instance.
 
     Args:
-        img_name (str): The image's name
-    Attributes:
-        image (surface): The surface holding the Sprite
+        name (TileName): The tile's name
+        image (Surface): The tile's image
+        is_passable (bool): Whether actors can walk over the tile
+        is_spawnpoint (bool): Whether an enemy spawns on the tile
+        is_damaging (bool): Whether the tile damages the player
+        is_door (bool): Whether the tile is a door
+        door_type (str): The direction the door leads, if it is one
+        is_portal (bool): Whether the tile leads to a new dungeon
+        behavior (Callable): Called with the State while the player stands on the tile
     """
-    def __init__(self, img_name: str):
-        super().__init__()
-        self.img_path = img_name
-        self.image = pygame.image.load(self.img_path)
-        self.rect = self.image.get_rect()
-
-        # This should probably be a dict or like TileAttributes or something
-        self._is_passable = True
-        self._has_behavior = False
-        self._is_spawnpoint = False
-        self._is_damaging = False
-        self._behavior = None
-        self._is_door = False
-        self._door_type = None
-        self._is_portal = False
+    __slots__ = (
+        "_name", "_image", "_is_passable", "_is_spawnpoint", "_is_damaging",
+        "_is_door", "_door_type", "_is_portal", "_behavior"
+    )
+
+    def __init__(self, name: 'TileSet.TileName', image: pygame.Surface, is_passable: bool = True,
+                 is_spawnpoint: bool = False, is_damaging: bool = False, is_door: bool = False,
+                 door_type: str = None, is_portal: bool = False, behavior=None):
+        self._name = name
+        self._image = image
+        self._is_passable = is_passable
+        self._is_spawnpoint = is_spawnpoint
+        self._is_damaging = is_damaging
+        self._is_door = is_door
+        self._door_type = door_type
+        self._is_portal = is_portal
+        self._behavior = behavior
 
     # Getters
     # ----------------------------------------------------------------------
+    def get_name(self) -> 'TileSet.TileName':
+        """Returns the tile's name
+
+        Returns:
+            TileName: The tile's name
+        """
+        return self._name
+
+    def get_image(self) -> pygame.Surface:
+        """Returns the tile's shared image
+
+        Returns:
+            Surface: The tile's image
+        """
+        return self._image
+
     def get_is_door(self):
         return self._is_door
 
@@ -61,7 +89,7 @@ class Tile(pygame.sprite.Sprite):
         Returns:
             Whether the tile has behavior or not
         """
-        return self._has_behavior
+        return self._behavior is not None
 
     def get_behavior(self):
         """Returns the tile's behavior
@@ -79,69 +107,38 @@ class Tile(pygame.sprite.Sprite):
         """
         return self._is_damaging
 
-    # Setters
-    # ----------------------------------------------------------------------
-    def set_is_door(self, value: bool) -> None:
-        """Set _is_door boolean for tile
+    def get_flags(self) -> int:
+        """Returns the tile's properties packed as TileSet.TileFlag bits
 
-        Args:
-            value (bool): True/False if tile is a door
-        """
-        self._is_door = value
-
-    def set_door_type(self, direction: str) -> None:
-        """Set _door_type field for tile
-
-        Args:
-            direction (str): North/South/East/West direction that door will be placed
-        """
-        self._door_type = direction
-
-    def set_is_portal(self, value: bool) -> None:
-        """Set _is_portal boolean for tile
-
-        Args:
-            value (bool): True/False if tile is a portal
+        Returns:
+            int: The tile's bitflags
         """
-        self._is_portal = value
-
-    def set_is_passable(self, value: bool):
-        """Set whether the tile is passable or not"""
-        self._is_passable = value
-
-    def set_is_spawnpoint(self, value: bool):
-        """Set whether the tile is a spawnpoint or not"""
-        self._is_spawnpoint = value
-
-    def set_has_behavior(self, value: bool):
-        """Set whether the tile has behavior or not"""
-        self._has_behavior = value
-
-    def set_behavior(self, value):
-        """Sets the tile's behavior"""
-        self._behavior = value
-
-    def set_is_damaging(self, value: bool):
-        """Set whether the tile damages the player"""
-        self._is_damaging = value
+        flags = TileSet.TileFlag(0)
+        if self._is_passable:
+            flags |= TileSet.TileFlag.PASSABLE
+        if self._is_damaging:
+            flags |= TileSet.TileFlag.DAMAGING
+        if self._is_spawnpoint:
+            flags |= TileSet.TileFlag.SPAWNPOINT
+        if self._is_door:
+            flags |= TileSet.TileFlag.DOOR
+        if self._is_portal:
+            flags |= TileSet.TileFlag.PORTAL
+
+        return int(flags)
 
     # Properties
     # ----------------------------------------------------------------------
-    is_passable = property(get_is_passable, set_is_passable)
-    has_behavior = property(get_has_behavior, set_has_behavior)
-    is_spawnpoint = property(get_is_spawnpoint, set_is_spawnpoint)
-    is_damaging = property(get_is_damaging, set_is_damaging)
-    is_door = property(get_is_door, set_is_door)
-    is_portal = property(get_is_portal, set_is_portal)
-    behavior = property(get_behavior, set_behavior)
-
-    # Methods
-    # ----------------------------------------------------------------------
-    def copy(self):
-        """Copies over a tile to a new tile"""
-        ret_t = Tile(self.img_path)
-        ret_t.__dict__ = self.__dict__.copy()
-        return ret_t
+    name = property(get_name)
+    image = property(get_image)
+    is_passable = property(get_is_passable)
+    has_behavior = property(get_has_behavior)
+    is_spawnpoint = property(get_is_spawnpoint)
+    is_damaging = property(get_is_damaging)
+    is_door = property(get_is_door)
+    door_type = property(get_door_type)
+    is_portal = property(get_is_portal)
+    behavior = property(get_behavior)
 
 
 class TileSet:
@@ -149,6 +146,10 @@ class TileSet:
 
     Attributes:
         TileName(enum): Holds the tilenames and their locations
+        TileFlag(enum): Bitflags for the properties of a tile
+        tiles (dict): The shared Tile for each TileName
+        tiles_by_id (list): The shared Tile for each tile id
+        flag_table (ndarray): The TileFlag bits for each tile id
     """
     class TileName(Enum):
         """Enum class representing tile names"""
@@ -163,40 +164,82 @@ class TileSet:
         WEST = "door-west.png"
         LOCK = "lock.png"
 
+    class TileFlag(IntFlag):
+        """Bitflags for the properties of a tile"""
+        PASSABLE = 1
+        DAMAGING = 2
+        SPAWNPOINT = 4
+        DOOR = 8
+        PORTAL = 16
+
     def __init__(self):
-        """Initializes the Tile dictionary"""
+        """Builds the single shared Tile for each TileName"""
         self.tiles = {}
-        for _, path in TileSet.TileName.__members__.items():
-            img_path = util.get_absolute_path_of_asset("images", "tiles", path.value)
-            self.tiles[path] = Tile(img_path)
+        for name in TileSet.TileName:
+            img_path = util.get_absolute_path_of_asset("images", "tiles", name.value)
+            self.tiles[name] = Tile(name, assets.load_image(img_path), **self.get_tile_flags(name))
 
-        self.init_behavior()
+        # Lookup tables indexed by tile id
+        self.tiles_by_id = [self.tiles[name] for name in TILE_NAMES]
+        self.flag_table = np.array([tile.get_flags() for tile in self.tiles_by_id], dtype=np.uint8)
 
     def get_tile(self, name: 'TileSet.TileName') -> Tile:
-        """Returns a copy of a tile"""
-        return self.tiles[name].copy()
-
-    def init_behavior(self):
-        # Later on, this information would be done in its own place, this only exists here for testing
-        self.tiles[self.TileName.WALL].is_passable = False
-        self.tiles[self.TileName.WALL_TWO].is_passable = False
-        self.tiles[self.TileName.NORTH].is_passable = False
-        self.tiles[self.TileName.EAST].is_passable = False
-        self.tiles[self.TileName.SOUTH].is_passable = False
-        self.tiles[self.TileName.WEST].is_passable = False
-
-        self.tiles[self.TileName.MUSHROOM].is_spawnpoint = True
-        self.tiles[self.TileName.SPIKES].is_damaging = True
-
-        self.tiles[self.TileName.NORTH].is_door = True
-        self.tiles[self.TileName.SOUTH].is_door = True
-        self.tiles[self.TileName.EAST].is_door = True
-        self.tiles[self.TileName.WEST].is_door = True
-
-        self.tiles[self.TileName.NORTH].door_type = "north"
-        self.tiles[self.TileName.SOUTH].door_type = "south"
-        self.tiles[self.TileName.EAST].door_type = "east"
-        self.tiles[self.TileName.WEST].door_type = "west"
-
-        self.tiles[self.TileName.LOCK].is_passable = True
-        self.tiles[self.TileName.LOCK].is_portal = True
+        """Returns the shared tile for a name"""
+        return self.tiles[name]
+
+    def get_tile_by_id(self, tile_id: int) -> Tile:
+        """Returns the shared tile for a tile id"""
+        return self.tiles_by_id[tile_id]
+
+    @staticmethod
+    def get_tile_flags(name: 'TileSet.TileName') -> dict:
+        """Returns the behavior flags for a kind of tile
+
+        Args:
+            name (TileName): The tile's name
+
+        Returns:
+            dict: Keyword arguments for the Tile constructor
+        """
+        tile_name = TileSet.TileName
+        doors = {
+            tile_name.NORTH: "north",
+            tile_name.SOUTH: "south",
+            tile_name.EAST: "east",
+            tile_name.WEST: "west"
+        }
+
+        if name in (tile_name.WALL, tile_name.WALL_TWO):
+            return {"is_passable": False}
+        if name in doors:
+            return {"is_passable": False, "is_door": True, "door_type": doors[name]}
+        if name is tile_name.MUSHROOM:
+            return {"is_spawnpoint": True}
+        if name is tile_name.SPIKES:
+            return {"is_damaging": True}
+        if name is tile_name.LOCK:
+            return {"is_portal": True}
+
+        return {}
+
+
+# Compact ids for each TileName, used by the uint8 room grids
+TILE_NAMES = list(TileSet.TileName)
+TILE_IDS = {name: tile_id for tile_id, name in enumerate(TILE_NAMES)}
+
+# The tile set shared by every room, built on first use
+_shared_tile_set = None
+
+
+def get_shared_tile_set() -> TileSet:
+    """Return the process-wide TileSet, loading it the first time
+
+    Returns:
+        TileSet: The shared tile set
+    """
+    global _shared_tile_set
+
+    if _shared_tile_set is None:
+        _shared_tile_set = TileSet()
+
+    return _shared_tile_set
@@ -1,5 +1,10 @@
-from common.entity import Projectile
+from common import util
 from common.item import Item
+from common.projectile_buffer import OWNER_PLAYER, ProjectileBuffer
+from common.rotation_cache import get_rotation_cache
+
+# The image of the arrow every weapon fires
+ARROW_IMAGE_PATH = util.get_absolute_path_of_asset("images", "tiles", "arrow.png")
 
 
 class Weapon(Item):
@@ -8,12 +13,31 @@ class Weapon(Item):
         self._speed = speed
         self._damage = damage
 
-    def generate_projectile(self, speed, angle, damage):
+    def generate_projectile(self, projectiles: ProjectileBuffer, position: tuple, speed: tuple,
+                            angle: float, damage: int, owner: int = OWNER_PLAYER) -> None:
+        """Fire a projectile from this weapon into a buffer
+
+        Args:
+            projectiles (ProjectileBuffer): Where the projectile is added
+            position (tuple): x/y position the projectile is fired from
+            speed (tuple): A normalized direction vector
+            angle (float): The angle the projectile is fired at
+            damage (int): Damage added to the weapon's own
+            owner (int): OWNER_PLAYER or OWNER_ENEMY
+        """
         adjusted_speed = \
             (speed[0]*self._speed, speed[1]*self._speed)
 
         adjusted_damage = self._damage + damage
-        return Projectile(adjusted_speed, adjusted_damage, angle)
+
+        # Rotated frames are bigger than the arrow, so each is shifted to
+        # keep the arrow, and its rect, centred where the unrotated one is
+        rotations = get_rotation_cache(ARROW_IMAGE_PATH)
+        offset_x, offset_y = rotations.get_offset(angle)
+        projectiles.add(
+            (position[0] + offset_x, position[1] + offset_y),
+            adjusted_speed, adjusted_damage, rotations.get_image(angle), owner
+        )
 
     def get_effect(self):
         return None